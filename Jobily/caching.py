@@ -0,0 +1,185 @@
+"""
+Response cache for read-heavy viewset actions.
+
+``cached_action`` caches an action's response data under a key built from
+the action, the parts named in ``vary_on`` and the current generation of each
+tag. Signals call ``invalidate_tags`` to bump a generation, which retires
+every entry built under the old one.
+
+Two things keep an expiring entry from being rebuilt by every worker at once:
+
+* entries are recomputed early with probability growing towards expiry
+  (XFetch: the check uses the time the last rebuild took), and
+* a rebuild takes a short ``cache.add`` lock; other workers keep serving the
+  old value, or wait briefly for the new one when there is none.
+
+Hits, misses, early rebuilds and lock waits are counted per action, see
+``metrics`` and ``Jobily.views.CacheMetricsView``.
+"""
+import functools
+import hashlib
+import math
+import random
+import threading
+import time
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+DEFAULT_TIMEOUT = 300
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+# Entries outlive their logical expiry so stale values can be served while
+# one worker rebuilds
+STALE_GRACE = 60
+METRICS_FLUSH_INTERVAL = 10
+METRICS = ('hit', 'miss', 'early', 'stale', 'wait')
+
+_registered = set()
+
+
+class Metrics:
+    """Per-process counters, added to shared cache counters in batches"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.flushed_at = time.monotonic()
+
+    def incr(self, name, metric):
+        with self.lock:
+            key = f"cached_action:metrics:{name}:{metric}"
+            self.pending[key] = self.pending.get(key, 0) + 1
+            if time.monotonic() - self.flushed_at < METRICS_FLUSH_INTERVAL:
+                return
+            pending, self.pending, self.flushed_at = self.pending, {}, time.monotonic()
+        self.flush(pending)
+
+    def flush(self, pending=None):
+        if pending is None:
+            with self.lock:
+                pending, self.pending = self.pending, {}
+        for key, value in pending.items():
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.add(key, 0, timeout=None)
+                cache.incr(key, value)
+
+    def snapshot(self):
+        self.flush()
+        keys = {
+            f"cached_action:metrics:{name}:{metric}": (name, metric)
+            for name in sorted(_registered) for metric in METRICS
+        }
+        values = cache.get_many(list(keys))
+        result = {}
+        for key, (name, metric) in keys.items():
+            result.setdefault(name, {})[metric] = values.get(key, 0)
+        return result
+
+
+metrics = Metrics()
+
+
+def tag_key(tag):
+    return f"cached_action:tag:{tag}"
+
+
+def invalidate_tags(*tags):
+    """Start a new generation for each tag"""
+    cache.set_many({tag_key(tag): time.time_ns() for tag in tags}, timeout=None)
+
+
+def _generations(tags):
+    keys = [tag_key(tag) for tag in tags]
+    generations = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in generations}
+    for key, generation in missing.items():
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+        generations[key] = generation
+    return [generations[key] for key in keys]
+
+
+def _key_parts(view, request, kwargs, vary_on):
+    parts = {}
+    for part in vary_on:
+        if part == 'user':
+            parts['user'] = request.user.pk
+        elif part == 'company':
+            employer_profile = getattr(request.user, 'employer_profile', None)
+            parts['company'] = employer_profile.company_id if employer_profile else None
+        elif part == 'query':
+            parts['query'] = sorted(request.query_params.lists())
+        else:
+            parts[part] = kwargs.get(part)
+    return parts
+
+
+def _should_refresh_early(entry, beta):
+    # XFetch: -log(random) is exponential, so few requests refresh long
+    # before expiry and almost every request refreshes right at it
+    delta = entry['delta'] * beta * -math.log(random.random() or 1e-12)
+    return time.time() + delta >= entry['expires']
+
+
+def cached_action(tags=(), timeout=DEFAULT_TIMEOUT, vary_on=('query',), beta=1.0):
+    """
+    Cache the data of a viewset action's 200 responses.
+
+    ``vary_on`` names the key parts: ``user``, ``company``, ``query`` or a URL
+    kwarg such as ``pk``. ``tags`` may use them as format fields, e.g.
+    ``'company-jobs:{company}'``. Place it below ``@action``.
+    """
+    def decorator(func):
+        name = func.__qualname__
+        _registered.add(name)
+
+        @functools.wraps(func)
+        def wrapper(view, request, *args, **kwargs):
+            parts = _key_parts(view, request, kwargs, vary_on)
+            entry_tags = [tag.format(**parts) for tag in tags]
+            fingerprint = repr((request.build_absolute_uri('/'), sorted(parts.items()), _generations(entry_tags)))
+            key = f"cached_action:{name}:{hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest()}"
+            lock_key = f"{key}:lock"
+
+            entry = cache.get(key)
+            if entry is not None and time.time() < entry['expires'] and not _should_refresh_early(entry, beta):
+                metrics.incr(name, 'hit')
+                return Response(entry['data'])
+
+            locked = cache.add(lock_key, 1, timeout=LOCK_TIMEOUT)
+            if not locked:
+                # Someone else is rebuilding
+                if entry is not None:
+                    metrics.incr(name, 'stale')
+                    return Response(entry['data'])
+                metrics.incr(name, 'wait')
+                deadline = time.monotonic() + LOCK_WAIT
+                while time.monotonic() < deadline:
+                    time.sleep(LOCK_POLL)
+                    entry = cache.get(key)
+                    if entry is not None:
+                        return Response(entry['data'])
+
+            metrics.incr(name, 'miss' if entry is None or time.time() >= entry['expires'] else 'early')
+            try:
+                # Without the lock (the wait ran out) this is a plain uncached call
+                started = time.time()
+                response = func(view, request, *args, **kwargs)
+                if response.status_code == 200:
+                    finished = time.time()
+                    cache.set(key, {
+                        'data': response.data,
+                        'delta': finished - started,
+                        'expires': finished + timeout,
+                    }, timeout=timeout + STALE_GRACE)
+                return response
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+
+        return wrapper
+    return decorator
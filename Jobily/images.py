@@ -0,0 +1,140 @@
+"""
+Resized WebP variants of company logos and profile pictures.
+
+List pages showed the original uploads, often several megabytes each. After
+an upload a Celery task renders one WebP per size in ``SIZES`` and records
+their names in the model's ``<field>_variants`` JSON field, together with
+the source name they were made from. ``VariantImageField`` returns the
+variant for ``?image_size=small|medium|large`` and the original while the
+variants aren't ready or the size isn't known.
+
+Recording the variants is a plain ``update()``: thumbnails don't change the
+object, so ``updated_at`` and the save signals are left alone. Fragments
+rendered for an ``image_size`` include whether the variants were ready in
+their key (``variants_ready``), so only those are rendered again.
+
+Variants are generated files, so they live in the default storage under
+names derived from the source name. Sources are content-addressed
+(``Jobily.storage``), so rerunning the task for the same upload finds the
+files in place and only records them.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .storage import BLOB_DIR, VARIANT_DIR
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels, images are never upscaled
+SIZES = {
+    'small': 64,
+    'medium': 256,
+    'large': 1024,
+}
+WEBP_QUALITY = 80
+
+
+def requested_size(request):
+    if request is None:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    size = params.get('image_size')
+    return size if size in SIZES else None
+
+
+def variant_name(source_name, size):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    if not source_name.startswith(f"{BLOB_DIR}/"):
+        # Legacy uploads and defaults aren't named by content
+        stem = hashlib.sha256(source_name.encode()).hexdigest()
+    return f"{VARIANT_DIR}/{stem[:2]}/{stem}/{size}.webp"
+
+
+def variants_attname(field_name):
+    return f"{field_name}_variants"
+
+
+def _render(image, pixels):
+    variant = image.copy()
+    variant.thumbnail((pixels, pixels), Image.LANCZOS)
+    buffer = io.BytesIO()
+    variant.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def generate(instance, field_name, force=False):
+    """
+    Render the variants of ``instance.<field_name>`` and save their names.
+
+    Returns True when the variants field was updated.
+    """
+    file = getattr(instance, field_name)
+    attname = variants_attname(field_name)
+    variants = getattr(instance, attname) or {}
+    if not file or (variants.get('source') == file.name and not force):
+        return False
+
+    storage = default_storage
+    names = {size: variant_name(file.name, size) for size in SIZES}
+    missing = [size for size, name in names.items() if force or not storage.exists(name)]
+    if missing:
+        try:
+            with file.open('rb') as handle:
+                image = Image.open(handle)
+                image = ImageOps.exif_transpose(image)
+                image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        except (OSError, UnidentifiedImageError):
+            logger.warning("Can't read %s of %s %s", field_name, instance._meta.label, instance.pk, exc_info=True)
+            return False
+        for size in missing:
+            if storage.exists(names[size]):
+                storage.delete(names[size])
+            storage.save(names[size], ContentFile(_render(image, SIZES[size])))
+
+    variants = {'source': file.name, **names}
+    # Skipped if another upload replaced the file meanwhile
+    updated = type(instance)._default_manager.filter(
+        pk=instance.pk, **{field_name: file.name}
+    ).update(**{attname: variants})
+    setattr(instance, attname, variants)
+    return bool(updated)
+
+
+def variants_ready(value):
+    """Whether the variants of the stored file ``value`` are recorded"""
+    if not value:
+        return False
+    variants = getattr(value.instance, variants_attname(value.field.name), None) or {}
+    return variants.get('source') == value.name
+
+
+def needs_variants(instance, field_name):
+    file = getattr(instance, field_name)
+    variants = getattr(instance, variants_attname(field_name)) or {}
+    return bool(file) and variants.get('source') != file.name
+
+
+class VariantImageField(serializers.ImageField):
+    """ImageField that renders the variant matching ``?image_size=``"""
+
+    def to_representation(self, value):
+        size = requested_size(self.context.get('request'))
+        use_url = getattr(self, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+        if not value or size is None or not use_url:
+            return super().to_representation(value)
+
+        variants = getattr(value.instance, variants_attname(value.field.name), None) or {}
+        if not variants_ready(value) or size not in variants:
+            return super().to_representation(value)
+
+        url = default_storage.url(variants[size])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
@@ -0,0 +1,240 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Count, F, Max
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.lookups import Exact
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from . import images
+from .serializers import requested_fields
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    # Validators describe the data, not the exact bytes, so the tag is weak
+    return f'W/"{digest}"'
+
+
+def conditional_response(request, response_factory, etag, last_modified=None):
+    """
+    Return 304 when the request validators match, otherwise build the
+    response with ``response_factory`` and attach ETag / Last-Modified.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    response = not_modified or response_factory()
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for ``list`` and ``retrieve``.
+
+    Validators come from one aggregate query (latest ``updated_at`` and row
+    count, plus whatever ``get_conditional_fingerprint`` adds), so a matching
+    ``If-None-Match`` returns 304 without running the serializer.
+    """
+
+    def get_conditional_fingerprint(self):
+        """Extra aggregates that change whenever the representation does"""
+        return {}
+
+    def get_variant_fingerprint(self):
+        """
+        Count of rows whose image variants are recorded, per sized image.
+
+        Variants are recorded without touching ``updated_at``, see
+        ``Jobily.images.generate``.
+        """
+        if images.requested_size(self.request) is None:
+            return {}
+        fingerprint = {}
+        for position, lookup in enumerate(_variant_lookups(self.get_serializer())):
+            ready = Exact(KeyTextTransform('source', images.variants_attname(lookup)), F(lookup))
+            fingerprint[f'_variants_{position}'] = Count(lookup, filter=ready)
+        return fingerprint
+
+    def get_validators(self, queryset):
+        values = queryset.order_by().aggregate(
+            _count=Count('pk', distinct=True),
+            _updated_at=Max('updated_at'),
+            **self.get_variant_fingerprint(),
+            **self.get_conditional_fingerprint()
+        )
+        if not values['_count'] and self.action == 'retrieve':
+            return None, None
+
+        timestamps = [value for value in values.values() if hasattr(value, 'timestamp')]
+        last_modified = max(timestamps) if timestamps else None
+        # Renderer, scheme, host and query string all change the response body
+        etag = make_etag(
+            sorted(values.items()),
+            self.request.build_absolute_uri(),
+            getattr(self.request.accepted_renderer, 'format', None),
+        )
+        return etag, last_modified
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(self.filter_queryset(self.get_queryset()))
+        return conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs), etag, last_modified
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            etag, last_modified = self.get_validators(queryset)
+        except (TypeError, ValueError, ValidationError):
+            etag = None
+        if etag is None:
+            # Let the regular code path produce the 404
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request, lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs), etag, last_modified
+        )
+
+
+def _variant_lookups(serializer, prefix=''):
+    """Query lookups of the sized image fields ``serializer`` renders"""
+    lookups = []
+    for field in serializer.fields.values():
+        if field.write_only or not field.source_attrs:
+            continue
+        child = field.child if isinstance(field, serializers.ListSerializer) else field
+        lookup = prefix + '__'.join(field.source_attrs)
+        if isinstance(child, images.VariantImageField):
+            lookups.append(lookup)
+        elif isinstance(child, serializers.BaseSerializer):
+            lookups += _variant_lookups(child, f"{lookup}__")
+    return lookups
+
+
+def prune_queryset(queryset, serializer):
+    """
+    Restrict ``queryset`` to what ``serializer`` renders.
+
+    Columns behind plain fields go into ``only()``; relations are joined or
+    prefetched only when a rendered field reaches into them. Fields that can't
+    be mapped to columns (method fields, properties) leave the columns alone.
+    """
+    model = queryset.model
+    columns = {model._meta.pk.name}
+    select, prefetch, full_relations = set(), set(), set()
+    restrict_columns = True
+
+    paths = [
+        (tuple(field.source_attrs), isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)))
+        for field in serializer.fields.values() if not field.write_only
+    ]
+    # Fragment versions are read for every row, keep them loaded
+    if getattr(serializer, 'cache_fragments', False):
+        paths += [(tuple(path.split('.')), False) for path in serializer.fragment_version_fields]
+    # Sized images read the variants column next to the image
+    paths += [
+        (tuple(field.source_attrs[:-1]) + (images.variants_attname(field.source_attrs[-1]),), False)
+        for field in serializer.fields.values()
+        if isinstance(field, images.VariantImageField) and field.source_attrs
+    ]
+
+    for attrs, nested in paths:
+        if not attrs:
+            restrict_columns = False
+            continue
+        try:
+            model_field = model._meta.get_field(attrs[0])
+        except FieldDoesNotExist:
+            restrict_columns = False
+            continue
+
+        if model_field.many_to_many or model_field.one_to_many:
+            prefetch.add(attrs[0])
+        elif model_field.is_relation:
+            if model_field.concrete:
+                columns.add(attrs[0])
+            if nested or len(attrs) > 1:
+                select.add(attrs[0])
+            if nested:
+                full_relations.add(attrs[0])
+            elif len(attrs) > 1:
+                columns.add('__'.join(attrs))
+        else:
+            columns.add(attrs[0])
+
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if restrict_columns:
+        columns = {
+            column for column in columns
+            if '__' not in column or column.split('__')[0] not in full_relations
+        }
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+class SparseFieldsetMixin:
+    """
+    Prune the queryset for ``?fields=`` requests.
+
+    Pair with ``Jobily.serializers.SparseFieldsetMixin`` on the serializer.
+    Requests without ``fields`` are left untouched.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if requested_fields(self.request) is None:
+            return queryset
+        return prune_queryset(queryset, self.get_serializer())
+
+
+class BatchRetrieveMixin:
+    """
+    ``GET <list url>/batch/?ids=3,1,2`` returns several objects in one query.
+
+    Results keep the order of ``ids``; ids that don't exist or aren't visible
+    through ``get_queryset`` are listed under ``missing``.
+    """
+    batch_max_ids = 100
+    batch_select_related = ()
+    batch_prefetch_related = ()
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        try:
+            ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            return Response({"error": "ids must be a comma separated list of integers"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return Response({"error": "ids is required"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.batch_max_ids:
+            return Response({"error": f"At most {self.batch_max_ids} ids per request"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.get_queryset()
+        if self.batch_select_related:
+            queryset = queryset.select_related(*self.batch_select_related)
+        if self.batch_prefetch_related:
+            queryset = queryset.prefetch_related(*self.batch_prefetch_related)
+        objects = self.filter_queryset(queryset).in_bulk(ids)
+
+        serializer = self.get_serializer([objects[pk] for pk in ids if pk in objects], many=True)
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in objects],
+        })
@@ -0,0 +1,185 @@
+"""
+Two-tier cache for reference data (skill categories, filter vocabularies).
+
+Reference data is read on almost every request and changes rarely, so each
+process keeps the values it has seen in a small LRU in front of the shared
+cache. Every value carries a version stamp. Shared entries are stored under
+the dataset's current generation; ``invalidate`` starts a new one and
+broadcasts the dataset name, and every process drops its local copy when
+the message arrives, so steady-state reads never leave the process. A load
+that started before an invalidation lands under the old generation and is
+never read.
+
+With the Redis cache backend the broadcast goes over Redis pub/sub. Other
+backends (locmem in tests) use an in-process broadcaster. As a backstop for
+missed messages, local entries are re-validated against the shared version
+after ``LOCAL_RECHECK`` seconds.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'refdata:invalidate'
+LOCAL_MAX_ENTRIES = 128
+LOCAL_RECHECK = 300
+SHARED_TIMEOUT = 60 * 60 * 24
+
+_loaders = {}
+
+
+class LocalTier:
+    """Thread-safe LRU of ``name -> (version, value, checked_at)``"""
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, name):
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None:
+                self.entries.move_to_end(name)
+            return entry
+
+    def set(self, name, version, value):
+        with self.lock:
+            self.entries[name] = (version, value, time.monotonic())
+            self.entries.move_to_end(name)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, name):
+        with self.lock:
+            self.entries.pop(name, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local = LocalTier()
+
+
+class LocalBroadcaster:
+    """In-process stand-in for the pub/sub channel"""
+
+    def publish(self, name):
+        local.discard(name)
+
+    def ensure_listening(self):
+        pass
+
+
+class RedisBroadcaster:
+    """Publishes invalidations on ``CHANNEL`` and listens in a daemon thread"""
+
+    def __init__(self, client):
+        self.client = client
+        self.pid = None
+
+    def publish(self, name):
+        local.discard(name)
+        try:
+            self.client.publish(CHANNEL, name)
+        except Exception:
+            logger.exception("Could not broadcast invalidation of %s", name)
+
+    def ensure_listening(self):
+        # Forked workers don't inherit the thread, start one per process
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        threading.Thread(target=self._listen, name='refdata-listener', daemon=True).start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                # Anything published while we were away is lost, start clean
+                local.clear()
+                for message in pubsub.listen():
+                    name = message.get('data')
+                    local.discard(name.decode() if isinstance(name, bytes) else name)
+            except Exception:
+                logger.warning("Reference data listener disconnected, retrying", exc_info=True)
+                time.sleep(1)
+
+
+_broadcaster = None
+
+
+def get_broadcaster():
+    global _broadcaster
+    if _broadcaster is None:
+        client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+        _broadcaster = RedisBroadcaster(client(write=True)) if client else LocalBroadcaster()
+    return _broadcaster
+
+
+def generation_key(name):
+    return f"refdata:generation:{name}"
+
+
+def shared_key(name, generation):
+    return f"refdata:{name}:{generation}"
+
+
+def _generation(name):
+    key = generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def dataset(name):
+    """Register the decorated function as the loader of ``name``"""
+    def decorator(loader):
+        _loaders[name] = loader
+        return loader
+    return decorator
+
+
+def get_versioned(name):
+    """Return ``(value, version)`` of a registered dataset"""
+    get_broadcaster().ensure_listening()
+
+    entry = local.get(name)
+    if entry is not None and time.monotonic() - entry[2] < LOCAL_RECHECK:
+        return entry[1], entry[0]
+
+    generation = _generation(name)
+    key = shared_key(name, generation)
+    shared = cache.get(key)
+    if shared is None:
+        shared = (time.time_ns(), _loaders[name]())
+        # Another process may have filled it meanwhile, keep the first value
+        if not cache.add(key, shared, timeout=SHARED_TIMEOUT):
+            shared = cache.get(key, shared)
+        if cache.get(generation_key(name)) != generation:
+            # Invalidated while loading, don't keep it in this process either
+            return shared[1], shared[0]
+
+    version, value = shared
+    local.set(name, version, value)
+    return value, version
+
+
+def get(name):
+    return get_versioned(name)[0]
+
+
+def invalidate(name):
+    """Drop ``name`` from the shared tier and from every process"""
+    cache.set(generation_key(name), time.time_ns(), timeout=None)
+    get_broadcaster().publish(name)
@@ -0,0 +1,346 @@
+"""
+Serializer helpers for hot read paths.
+
+Per-object fragment cache
+-------------------------
+
+A fragment is one object's rendered representation, cached under
+``(serializer, pk, version)`` where the version is built from the object's
+``updated_at`` (plus any related timestamps the representation depends on).
+Saving an object changes its version, so fragments never need explicit
+invalidation.
+
+The outermost serializer primes the cache for the whole page: it collects
+the fragment keys of every object and of every nested fragment-cached
+serializer, reads them with one ``get_many`` and writes the misses back with
+one ``set_many``. Nested relations are batch-loaded with
+``prefetch_related_objects`` while collecting keys, so rendering the misses
+does not fall back to per-row queries.
+
+Compiled representation
+-----------------------
+``CompiledRepresentationMixin`` renders read-only rows from a flat accessor
+plan instead of the generic ``Serializer.to_representation`` loop. The
+output is identical to the generic path, see the ``benchmark_serializers``
+management command.
+
+Sparse fieldsets
+----------------
+``SparseFieldsetMixin`` trims the representation with ``?fields=``;
+``Jobily.mixins.SparseFieldsetMixin`` prunes the queryset to match. Nested
+relations are fields like any other and are listed there too.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PKOnlyObject
+
+from . import images
+
+
+class FragmentStore:
+    def __init__(self, hits):
+        self.hits = hits
+        self.misses = {}
+
+    def get(self, key):
+        if key in self.hits:
+            return self.hits[key]
+        return self.misses.get(key)
+
+    def flush(self):
+        if self.misses:
+            cache.set_many(self.misses, timeout=settings.FRAGMENT_CACHE_TIMEOUT)
+
+
+def _resolve(instance, path):
+    for attr in path.split('.'):
+        if instance is None:
+            return None
+        instance = getattr(instance, attr)
+    return instance
+
+
+def _version(value):
+    if hasattr(value, 'timestamp'):
+        return repr(value.timestamp())
+    return str(value)
+
+
+class FragmentCacheMixin:
+    """
+    Serializer mixin that reads and writes per-object fragments.
+
+    ``fragment_version_fields`` lists the attribute paths that make up an
+    object's version. Set ``cache_fragments = False`` on serializers whose
+    own representation can't be versioned (e.g. no ``updated_at``); they still
+    prime their nested fragment-cached fields.
+    """
+    cache_fragments = True
+    fragment_version_fields = ('updated_at',)
+
+    def get_fragment_variant(self):
+        """Everything besides the object that changes the representation"""
+        request = self.context.get('request')
+        return (
+            # Scheme and host, both end up in absolute file URLs
+            request.build_absolute_uri('/') if request is not None else None,
+            tuple(field.field_name for field in self._readable_fields),
+            images.requested_size(request),
+        )
+
+    def _variant_fields(self):
+        fields = getattr(self, '_variant_field_list', None)
+        if fields is None:
+            fields = self._variant_field_list = [
+                field for field in self._readable_fields if isinstance(field, images.VariantImageField)
+            ]
+        return fields
+
+    def fragment_key(self, instance):
+        if not self.cache_fragments or getattr(instance, 'pk', None) is None:
+            return None
+        versions = []
+        for path in self.fragment_version_fields:
+            value = _resolve(instance, path)
+            if value is None:
+                return None
+            versions.append(_version(value))
+        if images.requested_size(self.context.get('request')) is not None:
+            # Variants are recorded without touching updated_at
+            for field in self._variant_fields():
+                versions.append('v' if images.variants_ready(_resolve(instance, field.source)) else 'o')
+
+        prefix = getattr(self, '_fragment_prefix', None)
+        if prefix is None:
+            variant = hashlib.md5(repr(self.get_fragment_variant()).encode(), usedforsecurity=False).hexdigest()[:12]
+            prefix = self._fragment_prefix = f"fragment:{self.__class__.__name__}:{variant}"
+        return f"{prefix}:{instance.pk}:{':'.join(versions)}"
+
+    def collect_fragment_keys(self, instances, keys):
+        """Add the fragment keys for ``instances`` and their nested fields"""
+        if not instances:
+            return
+
+        relations = {path.rsplit('.', 1)[0].replace('.', '__') for path in self.fragment_version_fields if '.' in path}
+        if relations:
+            prefetch_related_objects(instances, *relations)
+        for instance in instances:
+            key = self.fragment_key(instance)
+            if key:
+                keys.add(key)
+
+        for field in self._readable_fields:
+            many = isinstance(field, serializers.ListSerializer)
+            child = field.child if many else field
+            if not isinstance(child, FragmentCacheMixin) or '.' in field.source or field.source == '*':
+                continue
+
+            prefetch_related_objects(instances, field.source)
+            related = []
+            for instance in instances:
+                value = getattr(instance, field.source, None)
+                if many:
+                    related.extend(value.all() if isinstance(value, models.Manager) else value or ())
+                elif value is not None:
+                    related.append(value)
+            child.collect_fragment_keys(related, keys)
+
+    def prime_fragments(self, instances):
+        keys = set()
+        self.collect_fragment_keys(instances, keys)
+        store = FragmentStore(cache.get_many(list(keys)) if keys else {})
+        self.root._fragment_store = store
+        return store
+
+    def to_representation(self, instance):
+        if self.parent is None:
+            store = self.prime_fragments([instance])
+            data = self._cached_representation(instance, store)
+            store.flush()
+            return data
+        return self._cached_representation(instance, getattr(self.root, '_fragment_store', None))
+
+    def _cached_representation(self, instance, store):
+        key = self.fragment_key(instance) if store is not None else None
+        if key is None:
+            return super().to_representation(instance)
+
+        data = store.get(key)
+        if data is None:
+            data = super().to_representation(instance)
+            store.misses[key] = data
+        return data
+
+
+class FragmentListSerializer(serializers.ListSerializer):
+    """List serializer that primes and flushes the fragment cache per page"""
+
+    def to_representation(self, data):
+        if self.parent is not None or not isinstance(self.child, FragmentCacheMixin):
+            return super().to_representation(data)
+
+        items = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        store = self.child.prime_fragments(items)
+        representation = [self.child.to_representation(item) for item in items]
+        store.flush()
+        return representation
+
+
+# Field classes whose representation of a value of the listed types is the
+# value itself; anything else goes through field.to_representation
+PASSTHROUGH_TYPES = {
+    serializers.CharField: (str,),
+    serializers.EmailField: (str,),
+    serializers.URLField: (str,),
+    serializers.SlugField: (str,),
+    serializers.ChoiceField: (str,),
+    serializers.BooleanField: (bool,),
+    serializers.IntegerField: (int,),
+}
+
+_GENERIC = object()
+
+
+class CompiledRepresentationMixin:
+    """
+    Read-only fast path built from a per-class accessor plan.
+
+    For each readable field the plan stores the attribute path and whether the
+    value can be emitted as is. Fields that can't be resolved statically
+    (method sources, relations rendered as primary keys, ...) keep DRF's own
+    ``get_attribute`` / ``to_representation`` pair, and so does a field whose
+    path crosses a null relation, so edge cases keep their usual behaviour.
+    Errors are raised as they are, never hidden by a fallback.
+    """
+    compiled_representation = True
+
+    @classmethod
+    def _compile_plan(cls, fields):
+        # Sparse fieldsets change the readable fields, so plans are keyed by them
+        plans = cls.__dict__.get('_compiled_plans')
+        if plans is None:
+            plans = {}
+            setattr(cls, '_compiled_plans', plans)
+        names = tuple(field.field_name for field in fields)
+        plan = plans.get(names)
+        if plan is not None:
+            return plan
+
+        model = getattr(getattr(cls, 'Meta', None), 'model', None)
+        plan = []
+        for field in fields:
+            attrs = tuple(field.source_attrs)
+            if field.source == '*' and isinstance(field, serializers.SerializerMethodField):
+                plan.append((field.field_name, (), ()))
+            elif model is not None and _is_model_path(model, attrs) and not isinstance(field, serializers.RelatedField):
+                plan.append((field.field_name, attrs, PASSTHROUGH_TYPES.get(type(field), ())))
+            else:
+                plan.append((field.field_name, _GENERIC, ()))
+        plans[names] = plan
+        return plan
+
+    def _bound_plan(self):
+        bound = getattr(self, '_bound_compiled_plan', None)
+        if bound is None:
+            fields = list(self._readable_fields)
+            plan = self._compile_plan(fields)
+            by_name = {field.field_name: field for field in fields}
+            bound = self._bound_compiled_plan = [
+                (name, attrs, passthrough, by_name[name]) for name, attrs, passthrough in plan
+            ]
+        return bound
+
+    def to_representation(self, instance):
+        if not self.compiled_representation:
+            return super().to_representation(instance)
+
+        ret = {}
+        for name, attrs, passthrough, field in self._bound_plan():
+            if attrs is not _GENERIC:
+                value = instance
+                for attr in attrs:
+                    if value is None:
+                        break
+                    value = getattr(value, attr)
+                else:
+                    if value is None:
+                        ret[name] = None
+                    elif value.__class__ in passthrough:
+                        ret[name] = value
+                    else:
+                        ret[name] = field.to_representation(value)
+                    continue
+                # A null relation on the path, DRF decides between None,
+                # the default and skipping the field
+
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[name] = None if check_for_none is None else field.to_representation(attribute)
+        return ret
+
+
+def _is_model_path(model, attrs):
+    """True when every attribute in ``attrs`` is a concrete or forward field"""
+    if not attrs:
+        return False
+    for position, attr in enumerate(attrs):
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return False
+        if model_field.many_to_many or model_field.one_to_many or not model_field.concrete:
+            return False
+        if model_field.is_relation:
+            if position == len(attrs) - 1:
+                return False
+            model = model_field.related_model
+        elif position != len(attrs) - 1:
+            return False
+    return True
+
+
+def requested_fields(request):
+    """
+    Parse ``?fields=a,b`` into a set of field names.
+
+    None when the client didn't ask for a sparse fieldset.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    fields = params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Render only the fields named in ``?fields=``.
+
+    Without ``fields`` the full representation is returned. Only the
+    top-level serializer of a response is trimmed, nested serializers keep
+    their own fields, and write-only fields are never dropped.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if parent is not None and not (isinstance(parent, serializers.ListSerializer) and parent.parent is None):
+            return fields
+
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in requested or field.write_only}
@@ -17,6 +17,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Public address of the site, used in sitemaps and partner feeds
+SITE_URL = 'https://jobily.ge'
+
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
 # Application definition
@@ -68,7 +71,7 @@ WSGI_APPLICATION = 'Jobily.wsgi.application'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -77,6 +80,9 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Revocation lives in accounts.revocation instead of the blacklist app
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.RevocableTokenRefreshSerializer',
+    'TOKEN_VERIFY_SERIALIZER': 'accounts.serializers.RevocableTokenVerifySerializer',
 }
 
 # Database
@@ -136,6 +142,14 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Uploads (resumes, logos, profile pictures) are stored once per content,
+# see Jobily/storage.py. Generated files (feeds) use the default storage.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'blobs': {'BACKEND': 'Jobily.storage.ContentAddressedStorage'},
+}
+
 
 
 # Default primary key field type
@@ -150,6 +164,41 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Tbilisi'
 
+# Resume extraction runs on its own worker pool so large files can't hold up
+# the default queue: celery -A Jobily worker -Q resumes --concurrency=2
+CELERY_TASK_ROUTES = {
+    'accounts.tasks.index_profile_resume': {'queue': 'resumes'},
+    'jobs.tasks.extract_application_resume': {'queue': 'resumes'},
+}
+
+CELERY_BEAT_SCHEDULE = {
+    # Incremental updates can drift (e.g. renamed titles), rebuild hourly
+    'rebuild-autocomplete-index': {
+        'task': 'jobs.tasks.rebuild_autocomplete_index',
+        'schedule': timedelta(hours=1),
+    },
+    'build-job-feeds': {
+        'task': 'jobs.tasks.build_job_feeds',
+        'schedule': timedelta(minutes=15),
+    },
+    'prune-job-tombstones': {
+        'task': 'jobs.tasks.prune_job_tombstones',
+        'schedule': timedelta(days=1),
+    },
+    'prune-revoked-tokens': {
+        'task': 'accounts.tasks.prune_revoked_tokens',
+        'schedule': timedelta(hours=6),
+    },
+    'refresh-current-experience': {
+        'task': 'accounts.tasks.refresh_current_experience',
+        'schedule': timedelta(days=1),
+    },
+    'cleanup-blobs': {
+        'task': 'jobs.tasks.cleanup_blobs',
+        'schedule': timedelta(days=1),
+    },
+}
+
 INSTALLED_APPS += [
     'django_celery_results',
     'django_celery_beat',
@@ -162,3 +211,35 @@ CACHES = {
     }
 }
 
+# Serialized object fragments, see Jobily/serializers.py
+FRAGMENT_CACHE_TIMEOUT = 60 * 5
+
+# Users resolved from JWTs, see accounts/authentication.py
+AUTH_USER_CACHE_TIMEOUT = 60 * 5
+
+# Job seeker "me" documents, see accounts/documents.py
+ME_DOCUMENT_TIMEOUT = 60 * 10
+
+# Skill tagging of job texts, see jobs/skill_tagging.py. By default the
+# matches are only suggested (suggest_skills); True attaches them on save
+SKILL_TAGGING_ATTACH = False
+SKILL_SYNONYMS = {
+    'JavaScript': ['JS', 'ECMAScript'],
+    'TypeScript': ['TS'],
+    'PostgreSQL': ['Postgres'],
+    'Kubernetes': ['K8s'],
+    'Google Cloud': ['GCP'],
+    'C++': ['cpp'],
+    'Vue.js': ['Vue', 'VueJS'],
+    'React': ['ReactJS', 'React.js'],
+    'Microsoft SQL Server': ['MSSQL', 'SQL Server'],
+    'CI/CD': ['Continuous Integration'],
+    'REST API': ['RESTful'],
+}
+# Names that are also ordinary words only match with this exact case and
+# not as the first word of a sentence ("Go the extra mile", "swift delivery")
+SKILL_AMBIGUOUS_NAMES = [
+    'Go', 'Swift', 'Rust', 'Ruby', 'React', 'Angular', 'Flask', 'Flutter',
+    'Bootstrap', 'Oracle', 'Azure', 'Agile', 'Scrum', 'Git',
+]
+
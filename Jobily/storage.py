@@ -0,0 +1,142 @@
+"""
+Content-addressed storage for uploaded files.
+
+Resumes, logos and profile pictures are stored once per distinct content,
+under ``blobs/<aa>/<sha256><ext>``. The upload is hashed while it is
+streamed to a temporary file in chunks and then moved into place, or
+dropped when a blob with that digest already exists. The same resume sent
+with every application therefore takes the space of one file.
+
+Blobs are shared, so deleting a row never deletes its file. Blobs that no
+row references any more are removed by ``collect_garbage`` (the
+``cleanup_blobs`` command and a daily task), which counts the references
+across every file field that uses this storage, together with their
+resized variants. ``blobs_removed`` is sent with the removed names so data
+derived from them can go too.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage, storages
+from django.db import models
+from django.dispatch import Signal
+
+BLOB_DIR = 'blobs'
+# Resized images of a blob, see Jobily.images
+VARIANT_DIR = 'variants'
+HASH_CHUNK_SIZE = 64 * 1024
+# Blobs younger than this may belong to an upload whose row isn't saved yet
+GARBAGE_GRACE = 60 * 60
+
+# Sent by collect_garbage with ``names``, the blobs it deleted
+blobs_removed = Signal()
+
+
+def blob_storage():
+    """Storage of the uploaded file fields, configured in ``STORAGES['blobs']``"""
+    return storages['blobs']
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, equal names are the same file
+        return name
+
+    def blob_name(self, digest, ext):
+        return f"{BLOB_DIR}/{digest[:2]}/{digest}{ext.lower()}"
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1]
+        digest = hashlib.sha256()
+
+        if hasattr(content, 'temporary_file_path'):
+            # Large uploads are already on disk, hash them and move them
+            source = content.temporary_file_path()
+            with open(source, 'rb') as handle:
+                for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        else:
+            directory = self.path(BLOB_DIR)
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False) as handle:
+                source = handle.name
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    handle.write(chunk)
+
+        name = self.blob_name(digest.hexdigest(), ext)
+        full_path = self.path(name)
+        if os.path.exists(full_path):
+            if not hasattr(content, 'temporary_file_path'):
+                os.remove(source)
+            # Refresh the mtime so garbage collection sees a recent use
+            os.utime(full_path)
+            return name
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if hasattr(content, 'temporary_file_path'):
+            file_move_safe(source, full_path, allow_overwrite=True)
+        else:
+            # Concurrent uploads of the same content write identical bytes
+            os.replace(source, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+def blob_fields():
+    """``(model, field name)`` of every file field stored in blobs"""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def reference_counts():
+    """Number of rows referencing each blob"""
+    counts = Counter()
+    for model, field_name in blob_fields():
+        names = model._default_manager.filter(
+            **{f"{field_name}__startswith": f"{BLOB_DIR}/"}
+        ).values_list(field_name, flat=True)
+        counts.update(names.iterator())
+    return counts
+
+
+def collect_garbage(grace=GARBAGE_GRACE, dry_run=False):
+    """Delete blobs no row references, return their names"""
+    storage = blob_storage()
+    counts = reference_counts()
+    root = storage.path(BLOB_DIR)
+    cutoff = time.time() - grace
+    removed = []
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            name = os.path.relpath(full_path, storage.location).replace(os.sep, '/')
+            if counts[name] or os.path.getmtime(full_path) > cutoff:
+                continue
+            removed.append(name)
+            if not dry_run:
+                os.remove(full_path)
+                _delete_variants(name)
+    if removed and not dry_run:
+        blobs_removed.send(sender=collect_garbage, names=removed)
+    return removed
+
+
+def _delete_variants(name):
+    digest = os.path.splitext(os.path.basename(name))[0]
+    directory = f"{VARIANT_DIR}/{digest[:2]}/{digest}"
+    if default_storage.exists(directory):
+        for filename in default_storage.listdir(directory)[1]:
+            default_storage.delete(f"{directory}/{filename}")
@@ -11,7 +11,8 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 
-from accounts.views import JobSeekerRegistrationView, EmployerRegistrationView
+from accounts.views import JobSeekerRegistrationView, EmployerRegistrationView, TokenRevokeView
+from .views import CacheMetricsView
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -33,6 +34,7 @@ urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('api/token/revoke/', TokenRevokeView.as_view(), name='token_revoke'),
 
     # API endpoints
     path('api/accounts/', include('accounts.urls')),
@@ -41,6 +43,7 @@ urlpatterns = [
 
     path('api/companies/', include('companies.urls')),
     path('api/jobs/', include('jobs.urls')),
+    path('api/cache-metrics/', CacheMetricsView.as_view(), name='cache-metrics'),
 
     # Swagger documentation
     path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
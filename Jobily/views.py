@@ -0,0 +1,12 @@
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .caching import metrics
+
+
+class CacheMetricsView(APIView):
+    """Hit / miss / rebuild counters of the cached actions"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
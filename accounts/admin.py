@@ -1,3 +1,12 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Skill
+
+
+@admin.register(Skill)
+class SkillAdmin(admin.ModelAdmin):
+    # Saving runs Skill.clean (no cycles) and the closure signals
+    list_display = ('name', 'category', 'parent')
+    list_filter = ('category',)
+    search_fields = ('name',)
+    autocomplete_fields = ('parent',)
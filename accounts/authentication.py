@@ -0,0 +1,89 @@
+"""
+JWT authentication with a cached user lookup.
+
+``JWTAuthentication`` loads the user row on every request, and most views
+then load the employer or job seeker profile to check the user's role. The
+user is cached here together with the role bits of both profiles (ids,
+company id, posting rights), so ``hasattr(request.user, 'employer_profile')``
+and ``employer_profile.company_id`` cost nothing. Other profile fields are
+deferred and load on first access. The password hash is left out, only
+its digest for the token revoke check is kept; ``user.password`` loads from
+the database on first access. The user and profile signals drop the entry,
+see ``accounts.signals``.
+
+Revoked tokens are rejected here as well, see ``accounts.revocation``.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import revocation
+from .models import CustomUser
+
+# Bump when the cached fields change
+CACHE_VERSION = 2
+
+PROFILE_FIELDS = (
+    'employer_profile__id', 'employer_profile__user_id', 'employer_profile__company_id',
+    'employer_profile__is_company_admin', 'employer_profile__can_post_jobs',
+    'job_seeker_profile__id', 'job_seeker_profile__user_id',
+)
+
+
+def user_cache_key(user_id):
+    return f"auth:user:{CACHE_VERSION}:{user_id}"
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def load_user(user_id):
+    user_fields = [field.attname for field in CustomUser._meta.concrete_fields]
+    user = CustomUser.objects.select_related('employer_profile', 'job_seeker_profile').only(
+        *user_fields, *PROFILE_FIELDS
+    ).get(**{api_settings.USER_ID_FIELD: user_id})
+    user.password_digest = get_md5_hash_password(user.password)
+    # Keeps the hash out of the cache, the field is deferred from now on
+    del user.__dict__['password']
+    return user
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that reads the user from a short-lived cache entry"""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation.is_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken(_("Token has been revoked"))
+        return validated_token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            try:
+                user = load_user(user_id)
+            except CustomUser.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            # Reverse one-to-one caches hold None for a missing profile, so the
+            # hasattr role checks don't query either
+            cache.set(key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user.password_digest:
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
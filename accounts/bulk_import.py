@@ -0,0 +1,185 @@
+"""
+Bulk account import for onboarding universities and companies.
+
+The registration serializers create one user at a time: two ``exists()``
+checks, a slow password hash and a profile insert from the
+``create_user_profile`` signal per user. Here the rows are validated
+together, with one ``IN`` query per unique field, passwords are hashed
+across a process pool and users and profiles are inserted with
+``bulk_create`` in chunks.
+
+``bulk_create`` sends no signals, so profiles are created explicitly.
+New users have no cached auth entries or "me" documents to invalidate.
+
+Hashing thousands of passwords takes minutes, so the API stores the rows in
+the cache and imports them in a Celery task (``accounts.tasks.import_users``)
+one password at a time. The rows hold plaintext passwords: they are kept
+only briefly and deleted as soon as the task reads them. The process pool is only used by the
+``import_users`` command: forking a web or Celery worker would copy its
+threads' locks and share its database and Redis connections.
+"""
+import csv
+import io
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import CustomUser, EmployerProfile, JobSeekerProfile
+from .serializers import BulkUserRowSerializer
+
+CHUNK_SIZE = 500
+# Below this many passwords the pool costs more than it saves
+POOL_THRESHOLD = 50
+MAX_ROWS = 20000
+# How long queued rows wait for the import task, they hold plaintext passwords
+ROWS_CACHE_TIMEOUT = 60 * 10
+
+
+class BulkImportError(Exception):
+    pass
+
+
+def read_csv(file):
+    """Rows of a CSV upload or file, keyed by the header line"""
+    content = file.read()
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise BulkImportError("The CSV file must be UTF-8 encoded")
+    try:
+        return list(csv.DictReader(io.StringIO(content)))
+    except csv.Error as e:
+        raise BulkImportError(f"Invalid CSV file: {e}")
+
+
+def store_rows(rows):
+    """Keep ``rows`` for the import task, return their cache key"""
+    key = f"bulk_import_rows:{uuid.uuid4().hex}"
+    cache.set(key, rows, timeout=ROWS_CACHE_TIMEOUT)
+    return key
+
+
+def pop_rows(key):
+    """Rows stored under ``key``, deleted right away"""
+    rows = cache.get(key)
+    cache.delete(key)
+    return rows
+
+
+def hash_passwords(passwords, workers=1):
+    """Hash ``passwords``, across ``workers`` forked processes (``None``: CPU count)"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(passwords) < POOL_THRESHOLD or 'fork' not in multiprocessing.get_all_start_methods():
+        return [make_password(password) for password in passwords]
+    # Forked workers inherit the configured settings and hashers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def validate_rows(rows, user_type, company=None):
+    """Return ``(valid rows, errors)``; errors are ``{"row": index, "errors": ...}``"""
+    if user_type == 'employer' and company is None:
+        raise BulkImportError("Employer imports need a company")
+    if len(rows) > MAX_ROWS:
+        raise BulkImportError(f"At most {MAX_ROWS} rows can be imported at once")
+
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        serializer = BulkUserRowSerializer(data=row, context={'user_type': user_type})
+        if serializer.is_valid():
+            data = dict(serializer.validated_data)
+            data.setdefault('username', data['email'])
+            valid.append((index, data))
+        else:
+            errors.append({"row": index, "errors": serializer.errors})
+
+    # One IN query per unique field instead of two exists() per row
+    emails = {data['email'] for _, data in valid}
+    usernames = {data['username'] for _, data in valid}
+    taken_emails = set(CustomUser.objects.filter(email__in=emails).values_list('email', flat=True))
+    taken_usernames = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    unique, seen_emails, seen_usernames = [], set(), set()
+    for index, data in valid:
+        row_errors = {}
+        if data['email'] in taken_emails or data['email'] in seen_emails:
+            row_errors['email'] = ["This email is already registered."]
+        if data['username'] in taken_usernames or data['username'] in seen_usernames:
+            row_errors['username'] = ["This username is already taken."]
+        seen_emails.add(data['email'])
+        seen_usernames.add(data['username'])
+        if row_errors:
+            errors.append({"row": index, "errors": row_errors})
+        else:
+            unique.append((index, data))
+    errors.sort(key=lambda error: error['row'])
+    return unique, errors
+
+
+def _profiles(users, rows, user_type, company):
+    if user_type == 'job_seeker':
+        return JobSeekerProfile, [JobSeekerProfile(user_id=user.pk) for user in users]
+    return EmployerProfile, [
+        EmployerProfile(
+            user_id=user.pk,
+            company=company,
+            job_title=data.get('job_title', ''),
+            department=data.get('department', ''),
+        )
+        for user, (_, data) in zip(users, rows)
+    ]
+
+
+def _create_chunk(rows, hashes, user_type, company):
+    users = [
+        CustomUser(
+            email=data['email'],
+            username=data['username'],
+            password=password,
+            first_name=data.get('first_name', ''),
+            last_name=data.get('last_name', ''),
+            user_type=user_type,
+        )
+        for (_, data), password in zip(rows, hashes)
+    ]
+    with transaction.atomic():
+        users = CustomUser.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Backends that can't return ids from a bulk insert
+            ids = dict(CustomUser.objects.filter(email__in=[user.email for user in users]).values_list('email', 'id'))
+            for user in users:
+                user.pk = ids[user.email]
+        model, profiles = _profiles(users, rows, user_type, company)
+        model.objects.bulk_create(profiles)
+        if company is not None:
+            # bulk_create skips the signal that refreshes employees_count
+            type(company).objects.filter(id=company.id).update(updated_at=timezone.now())
+    return len(users)
+
+
+def import_users(rows, user_type, company=None, chunk_size=CHUNK_SIZE, workers=1):
+    """
+    Create ``user_type`` accounts (with profiles) from ``rows`` of dicts.
+
+    Returns ``{"created": n, "errors": [...]}``. Invalid rows are reported and
+    skipped; a chunk that hits a concurrent registration is reported as a whole.
+    """
+    valid, errors = validate_rows(rows, user_type, company)
+    hashes = hash_passwords([data['password'] for _, data in valid], workers)
+
+    created = 0
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            created += _create_chunk(chunk, hashes[start:start + chunk_size], user_type, company)
+        except IntegrityError as e:
+            errors.extend({"row": index, "errors": {"non_field_errors": [str(e)]}} for index, _ in chunk)
+    return {"created": created, "errors": errors}
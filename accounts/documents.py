@@ -0,0 +1,80 @@
+"""
+Cached "me" document of job seekers.
+
+``GET /api/accounts/job-seekers/me/`` is requested on every app launch and
+renders the user plus the full nested profile. The rendered document is
+cached per user (one entry per scheme and host, the profile holds absolute
+URLs) and served with two cache reads: the user's generation, then the
+document stored under it.
+
+Anything that changes the document (user, profile, skill, education or work
+experience changes, derived fields updated in bulk) starts a new generation,
+see ``accounts.signals``. A render that began before the change is stored
+under the old generation and never served, so concurrent writes can't leave
+an outdated document behind.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import JobSeekerProfile
+from .serializers import CustomUserSerializer, JobSeekerProfileSerializer
+
+
+def generation_key(user_id):
+    return f"me:generation:{user_id}"
+
+
+def document_key(user_id, generation):
+    return f"me:{user_id}:{generation}"
+
+
+def _generation(user_id):
+    key = generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = time.time_ns()
+        if not cache.add(key, generation, timeout=settings.ME_DOCUMENT_TIMEOUT):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def render(user, profile, context):
+    return {
+        'user': CustomUserSerializer(user, context=context).data,
+        'profile': JobSeekerProfileSerializer(profile, context=context).data if profile is not None else None,
+    }
+
+
+def get_document(request, context):
+    # Read before rendering, a change meanwhile moves on to a new generation
+    key = document_key(request.user.pk, _generation(request.user.pk))
+    origin = request.build_absolute_uri('/')
+    documents = cache.get(key) or {}
+    if origin in documents:
+        return documents[origin]
+
+    profile = JobSeekerProfile.objects.select_related('user').prefetch_related(
+        'skills', 'education', 'work_experience'
+    ).filter(user=request.user).first()
+    document = render(request.user, profile, context)
+    documents = cache.get(key) or {}
+    documents[origin] = document
+    cache.set(key, documents, timeout=settings.ME_DOCUMENT_TIMEOUT)
+    return document
+
+
+def invalidate(*user_ids):
+    keys = [generation_key(user_id) for user_id in user_ids if user_id is not None]
+    if keys:
+        # An expired generation is replaced by a new one, so the timeout is safe
+        transaction.on_commit(lambda: cache.set_many(
+            {key: time.time_ns() for key in keys}, timeout=settings.ME_DOCUMENT_TIMEOUT
+        ))
+
+
+def invalidate_skill(skill_id):
+    """Drop the documents of every profile with the skill"""
+    invalidate(*JobSeekerProfile.objects.filter(skills__id=skill_id).values_list('user_id', flat=True))
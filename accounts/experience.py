@@ -0,0 +1,80 @@
+"""
+Total work experience derived from ``WorkExperience`` rows.
+
+Positions often overlap (a side project next to a full-time job), so the
+date ranges are sorted and merged before they are summed. The result is
+stored on ``JobSeekerProfile.total_experience_months`` and kept up to date by
+the WorkExperience signals; ``recompute_experience`` refreshes it in bulk.
+"""
+from django.utils import timezone
+
+from . import documents
+from .models import JobSeekerProfile, WorkExperience
+
+DAYS_PER_MONTH = 365.25 / 12
+BATCH_SIZE = 1000
+
+
+def merge_intervals(intervals):
+    """Merge overlapping ``(start, end)`` date ranges"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def total_months(intervals, today=None):
+    """Months covered by ``intervals``; open-ended ranges run until today"""
+    today = today or timezone.localdate()
+    ranges = []
+    for start, end in intervals:
+        end = min(end or today, today)
+        if start <= end:
+            ranges.append((start, end))
+    days = sum((end - start).days + 1 for start, end in merge_intervals(ranges))
+    return round(days / DAYS_PER_MONTH)
+
+
+def _intervals(profile_ids):
+    intervals = {profile_id: [] for profile_id in profile_ids}
+    rows = WorkExperience.objects.filter(profile_id__in=profile_ids).values_list(
+        'profile_id', 'start_date', 'end_date', 'is_current'
+    )
+    for profile_id, start, end, is_current in rows:
+        intervals[profile_id].append((start, None if is_current else end))
+    return intervals
+
+
+def update_profile(profile_id):
+    """Recompute one profile without going through its save() and signals"""
+    months = total_months(_intervals([profile_id])[profile_id])
+    JobSeekerProfile.objects.filter(id=profile_id).update(total_experience_months=months)
+    return months
+
+
+def recompute(queryset=None, batch_size=BATCH_SIZE):
+    """Recompute the profiles in ``queryset`` (all by default), return how many changed"""
+    queryset = (queryset if queryset is not None else JobSeekerProfile.objects.all()).order_by('id')
+    today = timezone.localdate()
+    changed = 0
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).only('id', 'user_id', 'total_experience_months')[:batch_size])
+        if not batch:
+            return changed
+        last_id = batch[-1].id
+
+        intervals = _intervals([profile.id for profile in batch])
+        stale = []
+        for profile in batch:
+            months = total_months(intervals[profile.id], today)
+            if months != profile.total_experience_months:
+                profile.total_experience_months = months
+                stale.append(profile)
+        JobSeekerProfile.objects.bulk_update(stale, ['total_experience_months'])
+        documents.invalidate(*(profile.user_id for profile in stale))
+        changed += len(stale)
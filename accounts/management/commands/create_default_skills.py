@@ -1,4 +1,7 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from accounts import taxonomy
 from accounts.models import Skill
 
 class Command(BaseCommand):
@@ -35,6 +38,33 @@ class Command(BaseCommand):
                 'UI/UX Design', 'Problem Solving', 'Team Leadership'
             ]
         }
+        # Broader skill of each default skill, see accounts.taxonomy
+        default_parents = {
+            'TypeScript': 'JavaScript',
+            'Django': 'Python',
+            'Flask': 'Python',
+            'React': 'JavaScript',
+            'Angular': 'TypeScript',
+            'Vue.js': 'JavaScript',
+            'Express.js': 'JavaScript',
+            'jQuery': 'JavaScript',
+            'Spring Boot': 'Java',
+            'Laravel': 'PHP',
+            'Ruby on Rails': 'Ruby',
+            'SwiftUI': 'Swift',
+            'iOS': 'Mobile App Development',
+            'Android': 'Mobile App Development',
+            'Flutter': 'Mobile App Development',
+            'Xamarin': 'Mobile App Development',
+            'React Native': 'React',
+            'Redux': 'React',
+            'Material UI': 'React',
+            'SASS': 'CSS',
+            'Bootstrap': 'CSS',
+            'Tailwind CSS': 'CSS',
+            'Kubernetes': 'Docker',
+            'Scrum': 'Agile',
+        }
 
         for category, skills in default_skills.items():
             for skill_name in skills:
@@ -49,4 +79,20 @@ class Command(BaseCommand):
                 else:
                     self.stdout.write(
                         self.style.WARNING(f'Skill "{skill_name}" already exists')
-                    )
\ No newline at end of file
+                    )
+
+        skill_ids = dict(Skill.objects.filter(
+            name__in=set(default_parents) | set(default_parents.values())
+        ).values_list('name', 'id'))
+        with transaction.atomic():
+            for skill_name, parent_name in default_parents.items():
+                if parent_name not in skill_ids:
+                    continue
+                # Parents set by hand are kept
+                Skill.objects.filter(name=skill_name, parent__isnull=True).update(
+                    parent_id=skill_ids[parent_name], updated_at=timezone.now()
+                )
+            # update() skips the closure and cache signals
+            links = taxonomy.rebuild()
+        taxonomy.invalidate_caches()
+        self.stdout.write(self.style.SUCCESS(f'Skill hierarchy rebuilt with {links} links'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from Jobily import images
+from accounts.models import CustomUser
+from accounts.tasks import generate_profile_picture_variants
+from companies.models import Company
+from companies.tasks import generate_logo_variants
+
+
+class Command(BaseCommand):
+    help = 'Generates resized WebP variants of existing company logos and profile pictures'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render variants that already exist')
+        parser.add_argument('--async', action='store_true', dest='use_celery', help='Queue Celery tasks instead')
+
+    def handle(self, *args, **options):
+        for model, field_name, task in (
+            (Company, 'logo', generate_logo_variants),
+            (CustomUser, 'profile_picture', generate_profile_picture_variants),
+        ):
+            generated = 0
+            for instance in model.objects.exclude(**{field_name: ''}).iterator():
+                if not options['force'] and not images.needs_variants(instance, field_name):
+                    continue
+                if options['use_celery']:
+                    task.delay(instance.pk, force=options['force'])
+                    generated += 1
+                elif images.generate(instance, field_name, force=options['force']):
+                    generated += 1
+            verb = 'Queued' if options['use_celery'] else 'Generated'
+            self.stdout.write(self.style.SUCCESS(f'{verb} {field_name} variants for {generated} {model._meta.verbose_name_plural}'))
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from accounts import bulk_import
+from companies.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Creates job seeker or employer accounts in bulk from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV with a header line, or a JSON list of objects')
+        parser.add_argument('--user-type', choices=['job_seeker', 'employer'], default='job_seeker')
+        parser.add_argument('--company', type=int, help='Company id, required for employers')
+        parser.add_argument('--chunk-size', type=int, default=bulk_import.CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, help='Password hashing processes, defaults to the CPU count')
+
+    def handle(self, *args, **options):
+        company = None
+        if options['company']:
+            company = Company.objects.filter(id=options['company']).first()
+            if company is None:
+                raise CommandError(f"Company {options['company']} not found")
+
+        try:
+            with open(options['path'], encoding='utf-8-sig') as file:
+                rows = json.load(file) if options['path'].endswith('.json') else bulk_import.read_csv(file)
+        except UnicodeDecodeError:
+            raise CommandError("The file must be UTF-8 encoded")
+        except (ValueError, bulk_import.BulkImportError) as e:
+            raise CommandError(str(e))
+
+        try:
+            result = bulk_import.import_users(
+                rows, options['user_type'], company=company,
+                chunk_size=options['chunk_size'], workers=options['workers']
+            )
+        except bulk_import.BulkImportError as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(f"Created {result['created']} accounts, skipped {len(result['errors'])} rows"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from accounts import resume_text
+from accounts.models import JobSeekerProfile
+from accounts.tasks import index_profile_resume
+
+
+class Command(BaseCommand):
+    help = 'Extracts and indexes the resumes of job seekers that are not indexed yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--async', action='store_true', dest='use_celery', help='Queue Celery tasks instead')
+
+    def handle(self, *args, **options):
+        profiles = JobSeekerProfile.objects.only('id', 'resume', 'resume_indexed_name').order_by('id')
+        indexed = 0
+        for profile in profiles.iterator():
+            if not resume_text.needs_indexing(profile):
+                continue
+            if options['use_celery']:
+                index_profile_resume.delay(profile.id)
+            else:
+                resume_text.index_profile(profile)
+            indexed += 1
+        verb = 'Queued' if options['use_celery'] else 'Indexed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {indexed} resumes'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from accounts import experience
+
+
+class Command(BaseCommand):
+    help = 'Recomputes total_experience_months of every job seeker from their work experience'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=experience.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        changed = experience.recompute(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Updated {changed} profiles'))
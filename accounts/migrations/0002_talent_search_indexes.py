@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobseekerprofile',
+            index=models.Index(fields=['is_available', 'experience_years', 'id'], name='accounts_jo_is_avai_f6da9d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobseekerprofile',
+            index=models.Index(fields=['is_available', 'expected_salary'], name='accounts_jo_is_avai_18d03d_idx'),
+        ),
+        # Skill -> profile posting lists for talent search. The join table is
+        # created by the ManyToManyField, so the index is added in SQL.
+        migrations.RunSQL(
+            'CREATE INDEX accounts_jobseekerprofile_skills_posting_idx '
+            'ON accounts_jobseekerprofile_skills (skill_id, jobseekerprofile_id)',
+            'DROP INDEX accounts_jobseekerprofile_skills_posting_idx',
+        ),
+    ]
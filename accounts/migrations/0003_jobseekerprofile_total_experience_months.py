@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_talent_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobseekerprofile',
+            name='accounts_jo_is_avai_f6da9d_idx',
+        ),
+        migrations.AddField(
+            model_name='jobseekerprofile',
+            name='total_experience_months',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='jobseekerprofile',
+            index=models.Index(fields=['is_available', 'total_experience_months', 'id'], name='accounts_jo_is_avai_708d4f_idx'),
+        ),
+    ]
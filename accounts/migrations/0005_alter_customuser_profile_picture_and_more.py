@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:16
+
+import Jobily.storage
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customuser',
+            name='profile_picture',
+            field=models.ImageField(blank=True, default='profile_pictures/default.png', storage=Jobily.storage.blob_storage, upload_to='profile_pictures/'),
+        ),
+        migrations.AlterField(
+            model_name='jobseekerprofile',
+            name='resume',
+            field=models.FileField(blank=True, null=True, storage=Jobily.storage.blob_storage, upload_to='resumes/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx'])]),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_customuser_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('text', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='jobseekerprofile',
+            name='resume_indexed_name',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='ResumeTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resume_terms', to='accounts.jobseekerprofile')),
+            ],
+            options={
+                'unique_together': {('term', 'profile')},
+            },
+        ),
+    ]
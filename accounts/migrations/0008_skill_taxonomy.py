@@ -0,0 +1,43 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def add_self_links(apps, schema_editor):
+    # Every skill is its own ancestor at depth 0, existing skills are roots
+    Skill = apps.get_model('accounts', 'Skill')
+    SkillClosure = apps.get_model('accounts', 'SkillClosure')
+    SkillClosure.objects.bulk_create([
+        SkillClosure(ancestor_id=skill_id, descendant_id=skill_id, depth=0)
+        for skill_id in Skill.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_resumetext_jobseekerprofile_resume_indexed_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='accounts.skill'),
+        ),
+        migrations.CreateModel(
+            name='SkillClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField(default=0)),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='accounts.skill')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='accounts.skill')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'ancestor'], name='accounts_sk_descend_3c748c_idx')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(add_self_links, migrations.RunPython.noop),
+    ]
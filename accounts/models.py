@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
+from Jobily.storage import blob_storage
 
 
 class CustomUser(AbstractUser):
@@ -14,9 +16,12 @@ class CustomUser(AbstractUser):
     is_verified = models.BooleanField(default=False)
     profile_picture = models.ImageField(
         upload_to='profile_pictures/',
+        storage=blob_storage,
         default='profile_pictures/default.png',
         blank=True
     )
+    # Resized WebP copies of the picture, see Jobily.images
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -37,6 +42,14 @@ class Skill(models.Model):
         choices=CATEGORY_CHOICES,
         default='Other'
     )
+    # Broader skill this one belongs to, e.g. React under JavaScript
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='children'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -46,18 +59,47 @@ class Skill(models.Model):
     def __str__(self):
         return f"{self.name} ({self.category})"
 
+    def clean(self):
+        from . import taxonomy
+        try:
+            taxonomy.check_parent(self, self.parent)
+        except taxonomy.TaxonomyError as e:
+            raise ValidationError({'parent': str(e)})
+
+
+class SkillClosure(models.Model):
+    """Every (ancestor, descendant) pair of the skill hierarchy, see accounts.taxonomy"""
+    ancestor = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            # Ancestors of a skill
+            models.Index(fields=['descendant', 'ancestor']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
+
 
 class JobSeekerProfile(models.Model):
     user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='job_seeker_profile')
     bio = models.TextField(max_length=500, blank=True)
     resume = models.FileField(
         upload_to='resumes/',
+        storage=blob_storage,
         validators=[FileExtensionValidator(allowed_extensions=['pdf', 'doc', 'docx'])],
         blank=True,
         null=True
     )
+    # Resume the ResumeTerm rows were built from, see accounts.resume_text
+    resume_indexed_name = models.CharField(max_length=255, blank=True, editable=False)
     skills = models.ManyToManyField(Skill, blank=True)
     experience_years = models.PositiveIntegerField(default=0)
+    # Derived from work_experience, see accounts.experience
+    total_experience_months = models.PositiveIntegerField(default=0, editable=False)
     current_salary = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     expected_salary = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     phone_number = models.CharField(max_length=15, blank=True)
@@ -68,6 +110,13 @@ class JobSeekerProfile(models.Model):
     portfolio_website = models.URLField(blank=True)
     is_available = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # Talent search, see accounts.talent
+            models.Index(fields=['is_available', 'total_experience_months', 'id']),
+            models.Index(fields=['is_available', 'expected_salary']),
+        ]
+
     def __str__(self):
         return f"{self.user.email}'s Profile"
 
@@ -120,4 +169,38 @@ class WorkExperience(models.Model):
     description = models.TextField()
 
     def __str__(self):
-        return f"{self.profile.user.email} - {self.job_title} at {self.company_name}"
\ No newline at end of file
+        return f"{self.profile.user.email} - {self.job_title} at {self.company_name}"
+
+class RevokedToken(models.Model):
+    """JWT revoked before its expiry, see accounts.revocation"""
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='revoked_tokens')
+    expires_at = models.DateTimeField(db_index=True)
+    # Incremental refreshes of the revocation filter read by creation time
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class ResumeText(models.Model):
+    """Normalized text of a stored resume file, see accounts.resume_text"""
+    name = models.CharField(max_length=255, unique=True)
+    text = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ResumeTerm(models.Model):
+    """Inverted index of profile resumes for talent search"""
+    profile = models.ForeignKey(JobSeekerProfile, on_delete=models.CASCADE, related_name='resume_terms')
+    term = models.CharField(max_length=64)
+
+    class Meta:
+        # (term, profile) is the posting list of a term
+        unique_together = ('term', 'profile')
+
+    def __str__(self):
+        return self.term
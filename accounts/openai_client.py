@@ -0,0 +1,99 @@
+"""
+OpenAI chat completions client for profile text generation.
+
+Requests go through one pooled ``requests.Session`` per process with
+connect/read timeouts and retries on throttling and transient upstream
+errors. ``OPENAI_API_URL`` can point at a local stub server for tests and
+load benchmarks.
+"""
+import hashlib
+import json
+
+import requests
+from decouple import config
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+OPENAI_API_URL = config('OPENAI_API_URL', default='https://api.openai.com/v1/chat/completions')
+OPENAI_MODEL = config('OPENAI_MODEL', default='gpt-4o-mini')
+CONNECT_TIMEOUT = config('OPENAI_CONNECT_TIMEOUT', default=3.05, cast=float)
+READ_TIMEOUT = config('OPENAI_READ_TIMEOUT', default=30, cast=float)
+POOL_SIZE = 10
+
+# Bump when the prompt changes so cached texts are regenerated
+PROMPT_VERSION = 1
+ABOUT_ME_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+_session = None
+
+
+class OpenAIError(Exception):
+    def __init__(self, message, transient=False):
+        super().__init__(message)
+        # Timeouts, throttling and upstream failures may pass on a retry,
+        # a rejected request (bad key, invalid payload) won't
+        self.transient = transient
+
+
+def _is_transient(error):
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status is None or status == 429 or status >= 500
+    # RetryError means the session already ran out of retries on 429/5xx
+    return isinstance(error, (
+        requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.RetryError,
+    ))
+
+
+def get_session():
+    global _session
+    if _session is None:
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+def about_me_cache_key(first_name, skills):
+    payload = json.dumps([PROMPT_VERSION, first_name, sorted(skills)], ensure_ascii=False)
+    return f"about_me:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def generate_about_me(first_name, skills):
+    """Ask the model for a short Georgian about-me text"""
+    prompt = (
+        f"my name is {first_name} Generate cv like text. 150 characters. "
+        f"my skills are {', '.join(sorted(skills))}"
+    )
+    try:
+        response = get_session().post(
+            OPENAI_API_URL,
+            headers={"Authorization": f"Bearer {config('OPENAI_API_KEY', default='')}"},
+            json={
+                "model": OPENAI_MODEL,
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": "Create about me text. for Job Seeker. language Georgian"
+                    },
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.7
+            },
+            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+        )
+        response.raise_for_status()
+        return response.json()["choices"][0]["message"]["content"]
+    except requests.exceptions.RequestException as e:
+        raise OpenAIError(f"OpenAI API error: {e}", transient=_is_transient(e))
+    except (ValueError, KeyError, IndexError, TypeError):
+        raise OpenAIError("Invalid response from OpenAI")
@@ -0,0 +1,334 @@
+"""
+Resume text extraction and the resume term index.
+
+Text is pulled out of uploads as a stream, so a large file never sits in
+memory whole:
+
+* DOCX: ``word/document.xml`` is read from the zip with ``iterparse``,
+  clearing each paragraph once its text is taken.
+* PDF: the file is scanned in chunks for content streams; Flate streams are
+  inflated incrementally, unfiltered ones read as they are, and the literal
+  and hex strings of ``Tj``/``TJ`` operators kept. Streams with other
+  filters (images, fonts) are skipped. Hex strings are mapped through the
+  ``ToUnicode`` CMaps found in the file, which covers the Type0 fonts Word
+  and LaTeX export. This is deliberately crude: the CMaps of all fonts are
+  merged, and fonts with custom encodings and no CMap give no text.
+
+Other formats (``.doc``, images) are stored but not indexed. A resume that
+gives no text is logged and indexed without terms.
+
+The normalized text is stored once per file in ``ResumeText`` (uploads are
+content-addressed, so an application that reuses the profile resume costs
+nothing) and deleted with the blob, see ``Jobily.storage.blobs_removed``.
+Profile resumes are also split into terms in ``ResumeTerm``, which talent
+search uses for ``resume_q``.
+"""
+import logging
+import re
+import unicodedata
+import zipfile
+import zlib
+from xml.etree.ElementTree import iterparse
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import JobSeekerProfile, ResumeTerm, ResumeText
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+MAX_FILE_SIZE = 10 * 1024 * 1024
+MAX_TEXT_LENGTH = 100000
+# Caps the inflated size of a single PDF stream (zip bombs)
+MAX_STREAM_SIZE = 8 * 1024 * 1024
+# How far before a ``stream`` keyword its dictionary is looked for
+MAX_HEADER_SIZE = 1024
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 10
+DELETE_BATCH_SIZE = 500
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+PDF_TEXT = re.compile(
+    rb'\((?:\\.|[^\\)])*\)\s*Tj|<[0-9A-Fa-f\s]*>\s*Tj|\[(?:\((?:\\.|[^\\)])*\)|[^\]])*\]\s*TJ', re.S
+)
+PDF_STRING = re.compile(rb'\(((?:\\.|[^\\)])*)\)|<([0-9A-Fa-f\s]*)>', re.S)
+PDF_BFCHAR = re.compile(rb'beginbfchar(.*?)endbfchar', re.S)
+PDF_BFRANGE = re.compile(rb'beginbfrange(.*?)endbfrange', re.S)
+PDF_HEX = rb'<([0-9A-Fa-f\s]*)>'
+# Caps the codes a single bfrange line may map
+MAX_CMAP_RANGE = 0x10000
+PDF_FILTER = re.compile(rb'/Filter\s*(\[[^\]]*\]|/\w+)')
+PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'', b'f': b'', b'(': b'(', b')': b')', b'\\': b'\\'}
+TERM = re.compile(r'\w+')
+
+
+class ExtractionError(Exception):
+    pass
+
+
+def _docx_text(handle):
+    try:
+        archive = zipfile.ZipFile(handle)
+        document = archive.open('word/document.xml')
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ExtractionError(f"Not a DOCX file: {e}")
+    with archive, document:
+        parts = []
+        for _, element in iterparse(document, events=('end',)):
+            if element.tag == f'{WORD_NS}t' and element.text:
+                parts.append(element.text)
+            elif element.tag in (f'{WORD_NS}p', f'{WORD_NS}tab', f'{WORD_NS}br'):
+                if parts:
+                    yield ''.join(parts)
+                    parts = []
+                if element.tag == f'{WORD_NS}p':
+                    element.clear()
+        if parts:
+            yield ''.join(parts)
+
+
+def _pdf_unescape(raw):
+    def replace(match):
+        escape = match.group(1)
+        if escape[:1].isdigit():
+            return bytes([int(escape, 8) & 0xFF])
+        return PDF_ESCAPES.get(escape, escape)
+    return re.sub(rb'\\([0-7]{1,3}|.)', replace, raw, flags=re.S)
+
+
+def _hex(raw):
+    raw = re.sub(rb'\s', b'', raw)
+    return bytes.fromhex((raw + b'0' * (len(raw) % 2)).decode())
+
+
+def _utf16(data):
+    return data.decode('utf-16-be', errors='ignore')
+
+
+def _read_cmap(content, cmap):
+    """Add the ``bfchar``/``bfrange`` mappings of a ToUnicode CMap to ``cmap``"""
+    for block in PDF_BFCHAR.findall(content):
+        for source, target in re.findall(PDF_HEX + rb'\s*' + PDF_HEX, block):
+            cmap[_hex(source)] = _utf16(_hex(target))
+    for block in PDF_BFRANGE.findall(content):
+        for low, high, target in re.findall(PDF_HEX + rb'\s*' + PDF_HEX + rb'\s*(<[^>]*>|\[[^\]]*\])', block):
+            low, high = _hex(low), _hex(high)
+            start, end = int.from_bytes(low, 'big'), int.from_bytes(high, 'big')
+            if end < start or end - start >= MAX_CMAP_RANGE:
+                continue
+            codes = [(start + offset).to_bytes(len(low), 'big') for offset in range(end - start + 1)]
+            if target.startswith(b'['):
+                for code, value in zip(codes, re.findall(PDF_HEX, target)):
+                    cmap[code] = _utf16(_hex(value))
+            else:
+                first = _hex(target[1:-1])
+                base = int.from_bytes(first, 'big')
+                for offset, code in enumerate(codes):
+                    cmap[code] = _utf16((base + offset).to_bytes(max(len(first), 2), 'big'))
+
+
+def _decode_hex(data, cmap):
+    if not cmap:
+        if len(data) > 1 and not any(data[::2]):
+            # Two byte glyph ids of a font without a CMap, nothing to read
+            return ''
+        # Simple fonts write their single byte codes in hex too
+        return data.decode('latin-1')
+    lengths = sorted({len(code) for code in cmap}, reverse=True)
+    text, position = [], 0
+    while position < len(data):
+        for length in lengths:
+            value = cmap.get(data[position:position + length])
+            if value is not None:
+                text.append(value)
+                position += length
+                break
+        else:
+            # Unmapped code, skip it
+            position += lengths[-1]
+    if not text:
+        # The CMaps belong to other fonts
+        return _decode_hex(data, {})
+    return ''.join(text)
+
+
+def _pdf_stream_strings(content):
+    """``(literal bytes, hex bytes)`` of each text operator"""
+    for operator in PDF_TEXT.finditer(content):
+        literal, hex_ = [], []
+        for string, hex_string in PDF_STRING.findall(operator.group()):
+            if hex_string:
+                hex_.append(_hex(hex_string))
+            else:
+                literal.append(_pdf_unescape(string))
+        yield b''.join(literal), b''.join(hex_)
+
+
+def _stream_mode(header):
+    """How to read the stream whose dictionary ends ``header``"""
+    header = header[header.rfind(b'obj'):] if b'obj' in header else header
+    match = PDF_FILTER.search(header)
+    if match is None:
+        return 'raw'
+    filters = re.findall(rb'/(\w+)', match.group(1))
+    return 'flate' if filters in ([b'FlateDecode'], [b'Fl']) else 'skip'
+
+
+def _pdf_streams(handle):
+    """Yield the content of every readable stream"""
+    buffer = b''
+    mode, inflater = None, None
+    data, size = [], 0
+
+    def keep(piece):
+        nonlocal size
+        size += len(piece)
+        if size <= MAX_STREAM_SIZE:
+            data.append(piece)
+
+    while True:
+        chunk = handle.read(CHUNK_SIZE)
+        buffer += chunk
+        while True:
+            if mode is None:
+                start = buffer.find(b'stream')
+                if start == -1:
+                    # Keep a tail in case the keyword or the dictionary
+                    # before it straddles two chunks
+                    buffer = buffer[-MAX_HEADER_SIZE:]
+                    break
+                body = start + len(b'stream')
+                if body + 2 > len(buffer) and chunk:
+                    buffer = buffer[max(start - MAX_HEADER_SIZE, 0):]
+                    break
+                if buffer[start - 3:start] == b'end':
+                    buffer = buffer[body:]
+                    continue
+                mode = _stream_mode(buffer[max(start - MAX_HEADER_SIZE, 0):start])
+                buffer = buffer[body:].lstrip(b'\r\n')
+                inflater = zlib.decompressobj() if mode == 'flate' else None
+                data, size = [], 0
+
+            if mode == 'flate':
+                try:
+                    keep(inflater.decompress(buffer))
+                except zlib.error:
+                    # Declared Flate but isn't, skip it
+                    mode = 'skip'
+                    continue
+                if not inflater.eof:
+                    buffer = b''
+                    break
+                buffer = inflater.unused_data
+                mode = None
+                yield b''.join(data)
+                continue
+
+            # Unfiltered and skipped streams run until endstream
+            end = buffer.find(b'endstream')
+            if end == -1:
+                # Keep a tail in case endstream straddles two chunks
+                split = max(len(buffer) - len(b'endstream'), 0)
+                if mode == 'raw':
+                    keep(buffer[:split])
+                buffer = buffer[split:]
+                break
+            if mode == 'raw':
+                keep(buffer[:end])
+                yield b''.join(data)
+            buffer = buffer[end + len(b'endstream'):]
+            mode = None
+        if not chunk:
+            return
+
+
+def _pdf_text(handle):
+    # A CMap can come after the pages that use it, so hex strings are only
+    # decoded once the whole file was read
+    cmap, strings, length = {}, [], 0
+    for content in _pdf_streams(handle):
+        if b'begincmap' in content:
+            _read_cmap(content, cmap)
+            continue
+        if length >= MAX_TEXT_LENGTH:
+            continue
+        for literal, hex_ in _pdf_stream_strings(content):
+            strings.append((literal, hex_))
+            length += len(literal) + len(hex_) // 2
+    for literal, hex_ in strings:
+        yield literal.decode('latin-1') + _decode_hex(hex_, cmap)
+
+
+def extract(file):
+    """Yield the text of an open PDF or DOCX file in pieces"""
+    name = file.name.lower()
+    if name.endswith('.docx'):
+        return _docx_text(file)
+    if name.endswith('.pdf'):
+        return _pdf_text(file)
+    raise ExtractionError("Only PDF and DOCX resumes can be read")
+
+
+def normalize(text):
+    return ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+
+
+def terms(text):
+    return {term for term in TERM.findall(text) if 1 < len(term) <= MAX_TERM_LENGTH}
+
+
+def query_terms(query):
+    return sorted(terms(normalize(query)))[:MAX_QUERY_TERMS]
+
+
+def get_text(field_file):
+    """``ResumeText`` of a stored resume, extracted on first use"""
+    existing = ResumeText.objects.filter(name=field_file.name).first()
+    if existing is not None:
+        return existing
+    if field_file.size > MAX_FILE_SIZE:
+        raise ExtractionError(f"Resumes over {MAX_FILE_SIZE // (1024 * 1024)} MB are not indexed")
+
+    pieces, length = [], 0
+    with field_file.open('rb') as handle:
+        for piece in extract(handle):
+            pieces.append(piece)
+            length += len(piece) + 1
+            if length >= MAX_TEXT_LENGTH:
+                break
+    text = normalize(' '.join(pieces))[:MAX_TEXT_LENGTH]
+    if not text:
+        logger.warning("No text found in resume %s, it is stored without terms", field_file.name)
+    resume_text, _ = ResumeText.objects.get_or_create(name=field_file.name, defaults={'text': text})
+    return resume_text
+
+
+def needs_indexing(profile):
+    return (profile.resume.name or '') != profile.resume_indexed_name
+
+
+def index_profile(profile):
+    """Rebuild the term index of ``profile`` from its current resume"""
+    name = profile.resume.name or ''
+    words = set()
+    if name:
+        try:
+            words = terms(get_text(profile.resume).text)
+        except (ExtractionError, OSError) as e:
+            # Recorded as indexed (without terms) so saves don't retry it
+            logger.warning("Can't index resume %s of profile %s: %s", name, profile.id, e)
+    with transaction.atomic():
+        ResumeTerm.objects.filter(profile_id=profile.id).delete()
+        ResumeTerm.objects.bulk_create([ResumeTerm(profile_id=profile.id, term=term) for term in words])
+        # A newer upload queues its own run
+        current = Q(resume=name) if name else Q(resume='') | Q(resume__isnull=True)
+        JobSeekerProfile.objects.filter(current, id=profile.id).update(resume_indexed_name=name)
+    return len(words)
+
+
+def forget(names):
+    """Delete the stored texts of removed files"""
+    names = list(names)
+    for start in range(0, len(names), DELETE_BATCH_SIZE):
+        ResumeText.objects.filter(name__in=names[start:start + DELETE_BATCH_SIZE]).delete()
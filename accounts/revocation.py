@@ -0,0 +1,134 @@
+"""
+Revoked JWT ids.
+
+Revoked tokens are stored in ``RevokedToken`` with their expiry. Each process
+keeps a Bloom filter of the revoked JTIs, so the common case, a token that
+was never revoked, is answered by a few hash probes. Only a filter hit (a
+revoked token or a rare false positive) goes to the database.
+
+The filter is refreshed incrementally: every ``REFRESH_INTERVAL`` seconds the
+rows created since the last refresh are read, reaching ``REFRESH_OVERLAP``
+seconds further back. Ids and timestamps are assigned before commit, so a
+row can become visible after a newer one; the overlap catches it as long as
+its transaction took less than that, and absorbs clock skew between servers.
+Revocations from other processes therefore take effect within the interval;
+revocations made by this process take effect at once. Expired rows are
+pruned by the ``prune_revoked_tokens`` task, and the filter is rebuilt from
+the remaining rows every ``REBUILD_INTERVAL`` seconds or when it outgrows
+its capacity.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from .models import RevokedToken
+
+REFRESH_INTERVAL = 5
+# Re-read window for rows committed after newer ones (seconds)
+REFRESH_OVERLAP = 60
+REBUILD_INTERVAL = 60 * 60
+CAPACITY = 100000
+FALSE_POSITIVE_RATE = 0.001
+
+
+class BloomFilter:
+    def __init__(self, capacity=CAPACITY, error_rate=FALSE_POSITIVE_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        added = False
+        for position in self._positions(value):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not self.bits[byte] & bit:
+                self.bits[byte] |= bit
+                added = True
+        # Values read again in the refresh overlap aren't counted twice
+        if added:
+            self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationSnapshot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        # When the rows were last read
+        self.loaded_at = None
+        self.refreshed_at = 0
+        self.built_at = 0
+
+    def _rebuild(self):
+        now = timezone.now()
+        jtis = list(RevokedToken.objects.filter(expires_at__gt=now).values_list('jti', flat=True))
+        bloom = BloomFilter(capacity=max(CAPACITY, len(jtis) * 2))
+        for jti in jtis:
+            bloom.add(jti)
+        self.loaded_at = now
+        self.bloom = bloom
+        self.built_at = time.monotonic()
+
+    def refresh(self):
+        with self.lock:
+            now = time.monotonic()
+            if self.bloom is None or now - self.built_at > REBUILD_INTERVAL or self.bloom.count > self.bloom.capacity:
+                self._rebuild()
+            elif now - self.refreshed_at > REFRESH_INTERVAL:
+                loaded_at = timezone.now()
+                since = self.loaded_at - timedelta(seconds=REFRESH_OVERLAP)
+                for jti in RevokedToken.objects.filter(created_at__gte=since).values_list('jti', flat=True):
+                    self.bloom.add(jti)
+                self.loaded_at = loaded_at
+            else:
+                return
+            self.refreshed_at = now
+
+    def might_contain(self, jti):
+        if self.bloom is None or time.monotonic() - self.refreshed_at > REFRESH_INTERVAL:
+            self.refresh()
+        return jti in self.bloom
+
+    def add(self, jti):
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+
+snapshot = RevocationSnapshot()
+
+
+def is_revoked(jti):
+    if not jti or not snapshot.might_contain(jti):
+        return False
+    return RevokedToken.objects.filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+
+def revoke(token, user=None):
+    """Record ``token`` (a validated simplejwt token) as revoked until it expires"""
+    jti = token.get('jti')
+    if not jti:
+        return
+    expires_at = datetime.fromtimestamp(token['exp'], tz=dt_timezone.utc)
+    RevokedToken.objects.get_or_create(jti=jti, defaults={'expires_at': expires_at, 'user': user})
+    snapshot.add(jti)
+
+
+def prune():
+    """Delete rows of tokens that have expired anyway"""
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
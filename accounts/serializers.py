@@ -1,41 +1,55 @@
 from django.db import transaction
 from .models import CustomUser, JobSeekerProfile, EmployerProfile, Education, WorkExperience
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+from . import revocation
 from accounts.models import Skill
+from Jobily.images import VariantImageField
+from Jobily.serializers import FragmentCacheMixin, FragmentListSerializer, SparseFieldsetMixin
 
-class CustomUserSerializer(serializers.ModelSerializer):
-    profile_picture = serializers.ImageField(max_length=None, use_url=True, required=False)
+class CustomUserSerializer(FragmentCacheMixin, serializers.ModelSerializer):
+    profile_picture = VariantImageField(max_length=None, use_url=True, required=False)
 
     class Meta:
         model = CustomUser
         fields = ('id', 'email', 'username', 'password', 'user_type', 'is_verified', 'profile_picture')
         extra_kwargs = {'password': {'write_only': True}}
+        list_serializer_class = FragmentListSerializer
 
     def create(self, validated_data):
         user = CustomUser.objects.create_user(**validated_data)
         return user
 
 
-class EducationSerializer(serializers.ModelSerializer):
+class EducationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Education
         fields = '__all__'
 
 
-class WorkExperienceSerializer(serializers.ModelSerializer):
+class WorkExperienceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = WorkExperience
         fields = '__all__'
 
 
 
-class SkillSerializer(serializers.ModelSerializer):
+class SkillSerializer(FragmentCacheMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Skill
-        fields = ['id', 'name', 'category', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'category', 'parent', 'created_at', 'updated_at']
+        # The hierarchy is edited in the admin and by create_default_skills
+        read_only_fields = ['parent']
+        list_serializer_class = FragmentListSerializer
 
 
-class JobSeekerProfileSerializer(serializers.ModelSerializer):
+class JobSeekerProfileSerializer(FragmentCacheMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    # No updated_at on the profile, only the nested user and skills are cached
+    cache_fragments = False
+
     education = EducationSerializer(many=True, read_only=True)
     work_experience = WorkExperienceSerializer(many=True, read_only=True)
     user = CustomUserSerializer(read_only=True)
@@ -46,8 +60,9 @@ class JobSeekerProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = JobSeekerProfile
-        fields = '__all__'
+        exclude = ('resume_indexed_name',)
         read_only_fields = ('user',)
+        list_serializer_class = FragmentListSerializer
 
     def validate_current_salary(self, value):
         if value and value < 0:
@@ -66,7 +81,23 @@ class JobSeekerProfileSerializer(serializers.ModelSerializer):
         return value
 
 
-class EmployerProfileSerializer(serializers.ModelSerializer):
+class JobSeekerProfileSummarySerializer(FragmentCacheMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    """Light profile card for the talent list, ``?detail=full`` returns JobSeekerProfileSerializer"""
+    cache_fragments = False
+
+    user = CustomUserSerializer(read_only=True)
+    skills = serializers.SlugRelatedField(many=True, read_only=True, slug_field='name')
+
+    class Meta:
+        model = JobSeekerProfile
+        fields = (
+            'id', 'user', 'bio', 'skills', 'experience_years', 'total_experience_months', 'expected_salary',
+            'location', 'is_available',
+        )
+        list_serializer_class = FragmentListSerializer
+
+
+class EmployerProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = CustomUserSerializer(read_only=True)
 
     class Meta:
@@ -175,3 +206,55 @@ class EmployerRegistrationSerializer(serializers.ModelSerializer):
             company_id=company_id
         )
         return user
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuses revoked refresh tokens and revokes the old one on rotation"""
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if revocation.is_revoked(refresh.get(api_settings.JTI_CLAIM)):
+            raise InvalidToken("Token has been revoked")
+
+        data = super().validate(attrs)
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            revocation.revoke(refresh)
+        return data
+
+
+class RevocableTokenVerifySerializer(TokenVerifySerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if revocation.is_revoked(UntypedToken(attrs['token']).get(api_settings.JTI_CLAIM)):
+            raise InvalidToken("Token has been revoked")
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError:
+            raise serializers.ValidationError("Invalid refresh token")
+
+
+class BulkUserRowSerializer(serializers.Serializer):
+    """One row of a bulk import, uniqueness is checked for all rows at once"""
+    email = serializers.EmailField()
+    username = serializers.CharField(
+        max_length=150, required=False, validators=[CustomUser.username_validator]
+    )
+    password = serializers.CharField(write_only=True)
+    first_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    last_name = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    job_title = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    department = serializers.CharField(max_length=100, required=False, allow_blank=True)
+
+    def validate(self, data):
+        if self.context.get('user_type') == 'employer':
+            missing = {name: ["This field is required."] for name in ('job_title', 'department') if not data.get(name)}
+            if missing:
+                raise serializers.ValidationError(missing)
+        return data
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.core.cache import cache  # Import for cache operations
-from .models import CustomUser, JobSeekerProfile, EmployerProfile, Skill  # Ensure these models exist in your app
+from Jobily import images, refdata, storage
+from . import documents, experience, resume_text, tasks, taxonomy
+from .authentication import invalidate_user
+from .models import CustomUser, JobSeekerProfile, EmployerProfile, Skill, Education, WorkExperience  # Ensure these models exist in your app
 
 @receiver(post_save, sender=CustomUser)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -13,8 +16,95 @@ def create_user_profile(sender, instance, created, **kwargs):
             if hasattr(instance, '_company'):
                 EmployerProfile.objects.create(user=instance, company=instance._company)
 
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_save, sender=JobSeekerProfile)
+@receiver(post_delete, sender=JobSeekerProfile)
+@receiver(post_save, sender=EmployerProfile)
+@receiver(post_delete, sender=EmployerProfile)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_id = instance.pk if sender is CustomUser else instance.user_id
+    transaction.on_commit(lambda: invalidate_user(user_id))
+    documents.invalidate(user_id)
+
+
+def _profile_user_id(profile_id):
+    return JobSeekerProfile.objects.filter(id=profile_id).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=Education)
+@receiver(post_delete, sender=Education)
+def refresh_me_education(sender, instance, **kwargs):
+    documents.invalidate(_profile_user_id(instance.profile_id))
+
+
+@receiver(m2m_changed, sender=JobSeekerProfile.skills.through)
+def refresh_me_skills(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        # A skill was attached to or removed from profiles, drop theirs
+        if pk_set:
+            documents.invalidate(*JobSeekerProfile.objects.filter(id__in=pk_set).values_list('user_id', flat=True))
+    else:
+        documents.invalidate(instance.user_id)
+
+
 @receiver(post_save, sender=Skill)
 @receiver(post_delete, sender=Skill)
 def invalidate_skill_cache(sender, **kwargs):
-    cache_key = "categorized_skills"
-    cache.delete(cache_key)
+    # Every process drops its copy once the change is committed
+    transaction.on_commit(lambda: refdata.invalidate('skills_by_category'))
+
+
+@receiver(post_save, sender=Skill)
+@receiver(pre_delete, sender=Skill)
+def refresh_me_skill(sender, instance, **kwargs):
+    # The profile links are gone after the delete, collect the users before
+    documents.invalidate_skill(instance.pk)
+
+
+@receiver(pre_save, sender=Skill)
+def remember_previous_parent(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_parent_id = Skill.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_closure(sender, instance, created, **kwargs):
+    if created:
+        taxonomy.skill_created(instance)
+    elif instance.parent_id != getattr(instance, '_previous_parent_id', instance.parent_id):
+        taxonomy.skill_moved(instance)
+        taxonomy.invalidate_caches()
+
+
+@receiver(pre_delete, sender=Skill)
+def detach_skill_children(sender, instance, **kwargs):
+    taxonomy.skill_deleting(instance)
+    taxonomy.invalidate_caches()
+
+
+@receiver(post_save, sender=WorkExperience)
+@receiver(post_delete, sender=WorkExperience)
+def update_total_experience(sender, instance, **kwargs):
+    experience.update_profile(instance.profile_id)
+    # The total changed through update(), so the profile signals don't fire
+    documents.invalidate(_profile_user_id(instance.profile_id))
+
+
+@receiver(post_save, sender=CustomUser)
+def queue_profile_picture_variants(sender, instance, **kwargs):
+    if images.needs_variants(instance, 'profile_picture'):
+        transaction.on_commit(lambda: tasks.generate_profile_picture_variants.delay(instance.pk))
+
+
+@receiver(post_save, sender=JobSeekerProfile)
+def queue_resume_indexing(sender, instance, **kwargs):
+    if resume_text.needs_indexing(instance):
+        transaction.on_commit(lambda: tasks.index_profile_resume.delay(instance.pk))
+
+
+@receiver(storage.blobs_removed)
+def delete_removed_resume_texts(sender, names, **kwargs):
+    resume_text.forget(names)
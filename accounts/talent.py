@@ -0,0 +1,153 @@
+"""
+Talent search for employers.
+
+Skill matching reads the profile/skill join table from the skill side: the
+``(skill_id, jobseekerprofile_id)`` index is a posting list per skill, and a
+multi-skill query is one ``GROUP BY profile HAVING count(...)`` over the
+requested postings instead of one join per skill. A requested skill also
+matches its descendants ("JavaScript" matches "React"), through the skill
+closure table (``accounts.taxonomy``). The scalar filters
+(availability, experience, salary) are covered by composite indexes on the
+profile table. ``resume_q`` works the same way over the resume term index
+(``ResumeTerm``, see ``accounts.resume_text``): profiles whose resumes have
+every query term.
+
+Results are ranked by the number of matched skills, then experience, then
+id, and paginated with a keyset cursor over that ranking.
+"""
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, F, IntegerField, Q, Value
+
+from . import resume_text
+from .models import JobSeekerProfile, ResumeTerm
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_SKILLS = 20
+SKILL_MODES = ('all', 'any')
+# Column the results are ranked on after the skill match count
+EXPERIENCE_FIELD = 'total_experience_months'
+
+
+class SearchError(ValueError):
+    pass
+
+
+def encode_cursor(matched, experience, profile_id):
+    payload = json.dumps([matched, experience, profile_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        matched, experience, profile_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return int(matched), int(experience), int(profile_id)
+    except (ValueError, TypeError):
+        raise SearchError("Invalid cursor")
+
+
+def _int_list(value, name):
+    try:
+        return list(dict.fromkeys(int(item) for item in value.split(',') if item.strip()))
+    except ValueError:
+        raise SearchError(f"{name} must be a comma separated list of integers")
+
+
+def parse_params(params):
+    """Validate the query string into keyword arguments for ``search``"""
+    options = {
+        'skill_ids': _int_list(params.get('skills', ''), 'skills'),
+        'skills_mode': params.get('skills_mode', 'all'),
+        'location': params.get('location', '').strip(),
+        'resume_terms': resume_text.query_terms(params.get('resume_q', '')),
+    }
+    if options['skills_mode'] not in SKILL_MODES:
+        raise SearchError("skills_mode must be 'all' or 'any'")
+    if len(options['skill_ids']) > MAX_SKILLS:
+        raise SearchError(f"At most {MAX_SKILLS} skills per search")
+
+    try:
+        if params.get('min_experience'):
+            options['min_experience'] = int(params['min_experience'])
+        if params.get('max_expected_salary'):
+            options['max_expected_salary'] = Decimal(params['max_expected_salary'])
+        options['limit'] = max(1, min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except (ValueError, InvalidOperation):
+        raise SearchError("min_experience, max_expected_salary and limit must be numbers")
+
+    if 'is_available' in params:
+        options['is_available'] = params['is_available'].lower() in ('1', 'true', 'yes')
+    if params.get('cursor'):
+        options['cursor'] = decode_cursor(params['cursor'])
+    return options
+
+
+def _resume_matches(resume_terms):
+    """Profiles whose resume has every term, one pass over the postings"""
+    return ResumeTerm.objects.filter(term__in=resume_terms).values('profile_id').annotate(
+        matched=Count('term')
+    ).filter(matched=len(resume_terms)).values('profile_id')
+
+
+def _profile_filters(prefix='', is_available=None, min_experience=None, max_expected_salary=None, location='',
+                     resume_terms=()):
+    filters = Q()
+    if is_available is not None:
+        filters &= Q(**{f'{prefix}is_available': is_available})
+    if min_experience is not None:
+        # min_experience is in years, the column in months
+        filters &= Q(**{f'{prefix}{EXPERIENCE_FIELD}__gte': min_experience * 12})
+    if max_expected_salary is not None:
+        filters &= Q(**{f'{prefix}expected_salary__lte': max_expected_salary})
+    if location:
+        filters &= Q(**{f'{prefix}location__icontains': location})
+    if resume_terms:
+        filters &= Q(**{f'{prefix}id__in': _resume_matches(resume_terms)})
+    return filters
+
+
+def search(skill_ids=(), skills_mode='all', cursor=None, limit=DEFAULT_LIMIT, **filters):
+    """
+    Return ``(rows, next_cursor, has_more)`` where ``rows`` are
+    ``(profile_id, matched_skills)`` pairs in rank order.
+    """
+    if skill_ids:
+        through = JobSeekerProfile.skills.through
+        # One pass over the posting lists of the requested skills and their
+        # descendants, each requested skill counts once however many match
+        rows = through.objects.filter(
+            _profile_filters('jobseekerprofile__', **filters), skill__ancestor_links__ancestor_id__in=skill_ids
+        ).values('jobseekerprofile_id').annotate(
+            matched=Count('skill__ancestor_links__ancestor_id', distinct=True),
+            experience=F(f'jobseekerprofile__{EXPERIENCE_FIELD}'),
+            profile_id=F('jobseekerprofile_id'),
+        )
+        if skills_mode == 'all':
+            rows = rows.filter(matched=len(skill_ids))
+    else:
+        rows = JobSeekerProfile.objects.filter(_profile_filters(**filters)).values('id').annotate(
+            matched=Value(0, output_field=IntegerField()),
+            experience=F(EXPERIENCE_FIELD),
+            profile_id=F('id'),
+        )
+
+    if cursor is not None:
+        matched, experience, profile_id = cursor
+        rows = rows.filter(
+            Q(matched__lt=matched)
+            | Q(matched=matched, experience__lt=experience)
+            | Q(matched=matched, experience=experience, profile_id__lt=profile_id)
+        )
+
+    rows = rows.order_by('-matched', '-experience', '-profile_id').values_list('profile_id', 'matched', 'experience')
+    rows = list(rows[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = None
+    if has_more:
+        profile_id, matched, experience = rows[-1]
+        next_cursor = encode_cursor(matched, experience, profile_id)
+    return [(profile_id, matched) for profile_id, matched, _ in rows], next_cursor, has_more
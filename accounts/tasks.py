@@ -0,0 +1,105 @@
+from datetime import date, timedelta
+from celery import shared_task
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from Jobily import images
+from .models import CustomUser, JobSeekerProfile
+from companies.models import Company
+from . import bulk_import, documents, experience, openai_client, resume_text, revocation
+
+EXPERIENCE_REFRESHED_KEY = 'experience:refreshed_on'
+
+
+@shared_task
+def refresh_current_experience():
+    """
+    მიმდინარე სამუშაოს მქონე პროფილების გამოცდილების განახლება
+    """
+    # Open-ended positions grow every day without any row changing, and so
+    # do the ones ending in the future until the day they end
+    today = timezone.localdate()
+    last_run = cache.get(EXPERIENCE_REFRESHED_KEY)
+    since = date.fromisoformat(last_run) if last_run else today - timedelta(days=1)
+    profiles = JobSeekerProfile.objects.filter(
+        Q(work_experience__is_current=True) |
+        Q(work_experience__end_date__isnull=True) |
+        Q(work_experience__end_date__gte=since)
+    ).distinct()
+    changed = experience.recompute(profiles)
+    cache.set(EXPERIENCE_REFRESHED_KEY, today.isoformat(), timeout=None)
+    return f"Updated {changed} profiles"
+
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=10)
+def generate_about_me(self, profile_id):
+    """
+    პროფილის "ჩემს შესახებ" ტექსტის გენერაცია OpenAI-ით
+    """
+    profile = JobSeekerProfile.objects.select_related('user').get(id=profile_id)
+    skills = list(profile.skills.values_list('name', flat=True))
+    cache_key = openai_client.about_me_cache_key(profile.user.first_name, skills)
+
+    content = cache.get(cache_key)
+    if content is None:
+        try:
+            content = openai_client.generate_about_me(profile.user.first_name, skills)
+        except openai_client.OpenAIError as e:
+            if not e.transient:
+                raise
+            # The session already retried transient errors, give the upstream some time
+            raise self.retry(exc=e)
+        cache.set(cache_key, content, timeout=openai_client.ABOUT_ME_CACHE_TIMEOUT)
+
+    JobSeekerProfile.objects.filter(id=profile_id).update(about_me=content)
+    documents.invalidate(profile.user_id)
+    return {"about_me": content}
+
+
+@shared_task
+def prune_revoked_tokens():
+    """
+    ვადაგასული გაუქმებული ტოკენების წაშლა
+    """
+    deleted = revocation.prune()
+    return f"Pruned {deleted} revoked tokens"
+
+
+@shared_task
+def generate_profile_picture_variants(user_id, force=False):
+    """
+    პროფილის სურათის შემცირებული WebP ვერსიების გენერაცია
+    """
+    user = CustomUser.objects.filter(id=user_id).first()
+    if user is None:
+        return "User not found"
+    generated = images.generate(user, 'profile_picture', force=force)
+    return "Generated variants" if generated else "Variants are up to date"
+
+
+@shared_task(soft_time_limit=60, time_limit=90)
+def index_profile_resume(profile_id):
+    """
+    რეზიუმეს ტექსტის ამოღება და საძიებო ინდექსის განახლება
+    """
+    profile = JobSeekerProfile.objects.filter(id=profile_id).first()
+    if profile is None:
+        return "Profile not found"
+    if not resume_text.needs_indexing(profile):
+        return "Resume is already indexed"
+    return f"Indexed {resume_text.index_profile(profile)} terms"
+
+
+@shared_task
+def import_users(rows_key, user_type, company_id=None):
+    """
+    ანგარიშების მასობრივი იმპორტი ადმინის ატვირთული სიიდან
+    """
+    rows = bulk_import.pop_rows(rows_key)
+    if rows is None:
+        return {"created": 0, "errors": [], "error": "The uploaded rows expired"}
+    company = Company.objects.filter(id=company_id).first() if company_id else None
+    try:
+        return bulk_import.import_users(rows, user_type, company=company)
+    except bulk_import.BulkImportError as e:
+        return {"created": 0, "errors": [], "error": str(e)}
@@ -0,0 +1,118 @@
+"""
+Skill hierarchy as a closure table.
+
+``Skill.parent`` forms a forest ("JavaScript" > "React" > "React Native").
+``SkillClosure`` holds one row per (ancestor, descendant) pair, including
+each skill with itself at depth 0, so "a skill and everything below it" is a
+single indexed lookup on ``ancestor`` instead of a recursive query.
+
+The rows are kept current by the Skill signals (``accounts.signals``):
+creating a skill links it under its parent's ancestors, moving one relinks
+its subtree, deleting one detaches its children. ``rebuild`` recomputes the
+whole table, e.g. after ``create_default_skills``.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from Jobily import refdata
+from Jobily.caching import invalidate_tags
+
+from .models import Skill, SkillClosure
+
+
+class TaxonomyError(ValueError):
+    pass
+
+
+def descendant_ids(skill_ids):
+    """Subquery of the given skills and all their descendants"""
+    return SkillClosure.objects.filter(ancestor_id__in=skill_ids).values('descendant_id')
+
+
+def expand_terms(terms):
+    """
+    Subquery of the skills matching ``terms`` and their descendants.
+
+    A term is a skill id, a skill name or a category label.
+    """
+    ids, labels = set(), set()
+    for term in terms:
+        term = str(term).strip()
+        if term.isdigit():
+            ids.add(int(term))
+        elif term:
+            labels.add(term)
+
+    condition = Q(ancestor_id__in=ids)
+    for label in labels:
+        condition |= Q(ancestor__name__iexact=label) | Q(ancestor__category__iexact=label)
+    return SkillClosure.objects.filter(condition).values('descendant_id')
+
+
+def check_parent(skill, parent):
+    """Raise ``TaxonomyError`` if ``parent`` would make a cycle"""
+    if parent is None or skill.pk is None:
+        return
+    if parent.pk == skill.pk or SkillClosure.objects.filter(ancestor_id=skill.pk, descendant_id=parent.pk).exists():
+        raise TaxonomyError("A skill can't be placed under itself or one of its descendants")
+
+
+def _link_under(parent_id, subtree):
+    """Link ``subtree`` (``{descendant: depth below its root}``) under ``parent_id``"""
+    ancestors = SkillClosure.objects.filter(descendant_id=parent_id).values_list('ancestor_id', 'depth')
+    SkillClosure.objects.bulk_create([
+        SkillClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth + 1 + below)
+        for ancestor_id, depth in ancestors
+        for descendant_id, below in subtree.items()
+    ])
+
+
+def skill_created(skill):
+    with transaction.atomic():
+        SkillClosure.objects.create(ancestor_id=skill.pk, descendant_id=skill.pk, depth=0)
+        if skill.parent_id is not None:
+            _link_under(skill.parent_id, {skill.pk: 0})
+
+
+def skill_moved(skill):
+    """Relink the subtree of ``skill`` after its parent changed"""
+    with transaction.atomic():
+        subtree = dict(SkillClosure.objects.filter(ancestor_id=skill.pk).values_list('descendant_id', 'depth'))
+        # Links from outside the subtree into it go, the inner ones stay
+        SkillClosure.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+        if skill.parent_id is not None:
+            _link_under(skill.parent_id, subtree)
+
+
+def skill_deleting(skill):
+    """Detach the children of ``skill``, they become roots"""
+    below = list(SkillClosure.objects.filter(ancestor_id=skill.pk, depth__gt=0).values_list('descendant_id', flat=True))
+    above = list(SkillClosure.objects.filter(descendant_id=skill.pk).values_list('ancestor_id', flat=True))
+    # The rows of the skill itself go with it (CASCADE)
+    SkillClosure.objects.filter(descendant_id__in=below, ancestor_id__in=above).delete()
+
+
+def invalidate_caches():
+    """Drop what was derived from the skills once the change is committed"""
+    def invalidate():
+        refdata.invalidate('skills_by_category')
+        refdata.invalidate('skill_patterns')
+        # Cached job actions filter by skills
+        invalidate_tags('jobs')
+    transaction.on_commit(invalidate)
+
+
+def rebuild():
+    """Recompute the whole closure table from ``Skill.parent``"""
+    parents = dict(Skill.objects.values_list('id', 'parent_id'))
+    rows = []
+    for skill_id in parents:
+        ancestor_id, depth, seen = skill_id, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append(SkillClosure(ancestor_id=ancestor_id, descendant_id=skill_id, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    with transaction.atomic():
+        SkillClosure.objects.all().delete()
+        SkillClosure.objects.bulk_create(rows)
+    return len(rows)
@@ -1,3 +1,154 @@
-from django.test import TestCase
+import io
+import zipfile
+import zlib
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from . import experience, resume_text, revocation
+from .models import RevokedToken
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_added_values_are_found(self):
+        bloom = revocation.BloomFilter(capacity=100)
+        for value in ('a', 'b', 'c'):
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in ('a', 'b', 'c')))
+
+    def test_false_positives_stay_rare(self):
+        bloom = revocation.BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_adding_a_value_again_is_not_counted(self):
+        bloom = revocation.BloomFilter(capacity=100)
+        bloom.add('a')
+        bloom.add('a')
+        self.assertEqual(bloom.count, 1)
+
+
+class RevocationSnapshotTests(TestCase):
+    def revoke(self, jti, created_at=None):
+        token = RevokedToken.objects.create(jti=jti, expires_at=timezone.now() + timedelta(hours=1))
+        if created_at is not None:
+            RevokedToken.objects.filter(pk=token.pk).update(created_at=created_at)
+
+    def test_refresh_reads_new_rows(self):
+        snapshot = revocation.RevocationSnapshot()
+        self.revoke('first')
+        snapshot.refresh()
+        self.assertTrue(snapshot.might_contain('first'))
+
+        self.revoke('second')
+        snapshot.refreshed_at = 0
+        snapshot.refresh()
+        self.assertTrue(snapshot.might_contain('second'))
+
+    def test_refresh_rereads_rows_committed_late(self):
+        snapshot = revocation.RevocationSnapshot()
+        snapshot.refresh()
+        # Created before the last read, visible only after it
+        self.revoke('late', created_at=snapshot.loaded_at - timedelta(seconds=10))
+        snapshot.refreshed_at = 0
+        snapshot.refresh()
+        self.assertTrue(snapshot.might_contain('late'))
+
+    def test_expired_rows_are_not_revoked(self):
+        RevokedToken.objects.create(jti='old', expires_at=timezone.now() - timedelta(minutes=1))
+        with mock.patch.object(revocation, 'snapshot', revocation.RevocationSnapshot()):
+            self.assertFalse(revocation.is_revoked('old'))
+
+
+class ExperienceTests(SimpleTestCase):
+    def test_merge_intervals_joins_overlaps(self):
+        merged = experience.merge_intervals([
+            (date(2020, 6, 1), date(2021, 1, 1)),
+            (date(2020, 1, 1), date(2020, 7, 1)),
+            (date(2022, 1, 1), date(2022, 2, 1)),
+        ])
+        self.assertEqual(merged, [
+            [date(2020, 1, 1), date(2021, 1, 1)],
+            [date(2022, 1, 1), date(2022, 2, 1)],
+        ])
+
+    def test_total_months_counts_overlaps_once(self):
+        intervals = [(date(2020, 1, 1), date(2020, 12, 31)), (date(2020, 6, 1), date(2020, 12, 31))]
+        self.assertEqual(experience.total_months(intervals, today=date(2024, 1, 1)), 12)
+
+    def test_total_months_stops_at_today(self):
+        today = date(2024, 1, 1)
+        self.assertEqual(experience.total_months([(date(2023, 1, 1), None)], today=today), 12)
+        self.assertEqual(experience.total_months([(date(2023, 1, 1), date(2025, 1, 1))], today=today), 12)
+        self.assertEqual(experience.total_months([(date(2025, 1, 1), None)], today=today), 0)
+
+
+def pdf_object(number, content, flate=True):
+    data = zlib.compress(content) if flate else content
+    flate_filter = b'/Filter/FlateDecode' if flate else b''
+    return (
+        b'%d 0 obj<</Length %d%s>>stream\n' % (number, len(data), flate_filter)
+        + data + b'\nendstream\nendobj\n'
+    )
+
+
+class SmallReads(io.BytesIO):
+    """Returns a few bytes per read, so every token straddles chunks"""
+
+    def read(self, size=-1):
+        return super().read(7)
+
+
+class ResumeTextTests(SimpleTestCase):
+    def pdf_text(self, data):
+        return [
+            list(resume_text._pdf_text(io.BytesIO(data))),
+            list(resume_text._pdf_text(SmallReads(data))),
+        ]
+
+    def test_pdf_literal_strings(self):
+        content = b'BT (Python \\(3\\)) Tj [(Dj) -20 (ango)] TJ ET'
+        data = b'%PDF-1.4\n' + pdf_object(1, content) + pdf_object(2, b'BT (Raw) Tj ET', flate=False)
+        for text in self.pdf_text(data):
+            self.assertEqual(text, ['Python (3)', 'Django', 'Raw'])
+
+    def test_pdf_skips_other_filters(self):
+        data = b'%PDF-1.4\n1 0 obj<</Filter/DCTDecode>>stream\n(Image) Tj\nendstream\nendobj\n'
+        for text in self.pdf_text(data):
+            self.assertEqual(text, [])
+
+    def test_pdf_hex_strings_use_the_cmap(self):
+        cmap = (
+            b'begincmap\n1 beginbfchar\n<0003> <0020>\nendbfchar\n'
+            b'1 beginbfrange\n<0024> <0030> <0041>\nendbfrange\nendcmap'
+        )
+        content = b'BT <00240025 0026> Tj [<0003>] TJ <48690A> Tj ET'
+        # The CMap comes after the page that uses it
+        data = b'%PDF-1.5\n' + pdf_object(1, content) + pdf_object(2, cmap)
+        for text in self.pdf_text(data):
+            self.assertEqual(text, ['ABC', ' ', 'Hi\n'])
+
+    def test_pdf_glyph_ids_without_cmap_give_no_text(self):
+        data = b'%PDF-1.5\n' + pdf_object(1, b'BT <00240025> Tj ET')
+        self.assertEqual(list(resume_text._pdf_text(io.BytesIO(data))), [''])
+
+    def test_docx_paragraphs(self):
+        namespace = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+        body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r></w:p>' for text in ('Python developer', 'ქართული'))
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('word/document.xml', f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>')
+        buffer.seek(0)
+        self.assertEqual(list(resume_text._docx_text(buffer)), ['Python developer', 'ქართული'])
+
+    def test_docx_rejects_other_files(self):
+        with self.assertRaises(resume_text.ExtractionError):
+            list(resume_text._docx_text(io.BytesIO(b'not a zip')))
+
+    def test_terms(self):
+        text = resume_text.normalize('Senior  PYTHON Developer, a ქართული')
+        self.assertEqual(resume_text.terms(text), {'senior', 'python', 'developer', 'ქართული'})
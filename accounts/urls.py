@@ -2,7 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     JobSeekerProfileViewSet,
-    EmployerProfileViewSet, EducationViewSet, WorkExperienceViewSet, SkillViewSet
+    EmployerProfileViewSet, EducationViewSet, WorkExperienceViewSet, SkillViewSet,
+    BulkUserImportView, BulkUserImportStatusView
 )
 
 router = DefaultRouter()
@@ -14,6 +15,8 @@ router.register(r'work-experience', WorkExperienceViewSet)
 router.register('skills', SkillViewSet, basename='skill')
 
 urlpatterns = [
+    path('bulk-import/', BulkUserImportView.as_view(), name='bulk-import'),
+    path('bulk-import/<str:task_id>/', BulkUserImportStatusView.as_view(), name='bulk-import-status'),
     path('', include(router.urls)),
 ]
 
@@ -1,42 +1,117 @@
-import json
-import requests
-from django.core import cache
+from celery.result import AsyncResult
+from django.core.cache import cache
 from django.db import transaction
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from Jobily.mixins import ConditionalGetMixin, SparseFieldsetMixin, conditional_response, make_etag
+from Jobily import images, refdata
+from Jobily.serializers import requested_fields
 from accounts.models import Skill
-from .models import JobSeekerProfile, EmployerProfile, Education, WorkExperience
+from companies.models import Company
+from . import bulk_import, documents, openai_client, revocation, talent, tasks
+from .models import CustomUser, JobSeekerProfile, EmployerProfile, Education, WorkExperience
 from .serializers import (
-    CustomUserSerializer, JobSeekerProfileSerializer,
+    CustomUserSerializer, JobSeekerProfileSerializer, JobSeekerProfileSummarySerializer,
     EmployerProfileSerializer, EducationSerializer, WorkExperienceSerializer, EmployerRegistrationSerializer,
-    JobSeekerRegistrationSerializer, SkillSerializer
+    JobSeekerRegistrationSerializer, SkillSerializer, TokenRevokeSerializer
 )
-from decouple import config
 
-def get_openai_api_key():
-    return config('OPENAI_API_KEY')
 
-class JobSeekerProfileViewSet(viewsets.ModelViewSet):
+@refdata.dataset('skills_by_category')
+def skills_by_category():
+    categorized_skills = {}
+    for skill in Skill.objects.all():
+        categorized_skills.setdefault(skill.category, []).append({
+            'id': skill.id,
+            'name': skill.name,
+            'created_at': skill.created_at
+        })
+    return categorized_skills
+
+
+class TalentCursorPagination(CursorPagination):
+    # Keyset pages stay cheap however deep the client scrolls
+    ordering = '-id'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class JobSeekerProfileViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = JobSeekerProfile.objects.all()
     serializer_class = JobSeekerProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    @property
+    def pagination_class(self):
+        return TalentCursorPagination if self.action == 'list' else None
+
+    def is_full_detail(self):
+        return self.request.query_params.get('detail') == 'full'
+
+    def get_serializer_class(self):
+        if self.action == 'list' and not self.is_full_detail():
+            return JobSeekerProfileSummarySerializer
+        return JobSeekerProfileSerializer
+
     def get_queryset(self):
         if self.action == 'list':
-            return JobSeekerProfile.objects.all()
+            queryset = JobSeekerProfile.objects.select_related('user').prefetch_related('skills')
+            if self.is_full_detail():
+                queryset = queryset.prefetch_related('education', 'work_experience')
+            return queryset
         return JobSeekerProfile.objects.filter(user=self.request.user)
 
+    @action(detail=False, methods=['GET'])
+    def search(self, request):
+        """Rank candidates by skills, experience, salary, location and availability"""
+        if not (request.user.is_staff or hasattr(request.user, 'employer_profile')):
+            return Response(
+                {"error": "Only employers can search candidates"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            ranked, cursor, has_more = talent.search(**talent.parse_params(request.query_params))
+        except talent.SearchError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        profiles = JobSeekerProfile.objects.select_related('user').prefetch_related('skills').in_bulk(
+            [profile_id for profile_id, _ in ranked]
+        )
+        # Profiles deleted since the ranking query are skipped
+        ranked = [(profile_id, matched) for profile_id, matched in ranked if profile_id in profiles]
+        serializer = JobSeekerProfileSummarySerializer(
+            [profiles[profile_id] for profile_id, _ in ranked], many=True, context=self.get_serializer_context()
+        )
+        results = serializer.data
+        for item, (_, matched) in zip(results, ranked):
+            item['matched_skills'] = matched
+
+        return Response({
+            'results': results,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
     @action(detail=False, methods=['GET', 'PUT', 'PATCH'])
     def me(self, request):
         if request.method == 'GET':
+            if requested_fields(request) is None and images.requested_size(request) is None:
+                # The full document is cached, see accounts.documents
+                return Response(documents.get_document(request, self.get_serializer_context()))
             try:
                 profile = JobSeekerProfile.objects.get(user=request.user)
                 profile_serializer = self.get_serializer(profile)
-                user_serializer = CustomUserSerializer(request.user)
+                # The request context picks the ?image_size= variant
+                user_serializer = CustomUserSerializer(request.user, context=self.get_serializer_context())
 
                 return Response({
                     'user': user_serializer.data,
@@ -44,7 +119,7 @@ class JobSeekerProfileViewSet(viewsets.ModelViewSet):
                 })
             except JobSeekerProfile.DoesNotExist:
                 return Response({
-                    'user': CustomUserSerializer(request.user).data,
+                    'user': CustomUserSerializer(request.user, context=self.get_serializer_context()).data,
                     'profile': None
                 })
 
@@ -60,8 +135,9 @@ class JobSeekerProfileViewSet(viewsets.ModelViewSet):
                 serializer.is_valid(raise_exception=True)
                 serializer.save()
 
+                # The save started a new generation, the next GET renders it
                 return Response({
-                    'user': CustomUserSerializer(request.user).data,
+                    'user': CustomUserSerializer(request.user, context=self.get_serializer_context()).data,
                     'profile': serializer.data
                 })
             except JobSeekerProfile.DoesNotExist:
@@ -70,70 +146,53 @@ class JobSeekerProfileViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-    @action(detail=False, methods=['GET', 'PUT', 'PATCH'])
+    @action(detail=False, methods=['GET', 'POST', 'PUT', 'PATCH'])
     def generate_about_me(self, request, *args, **kwargs):
-        profile = JobSeekerProfile.objects.get(user=request.user)
-        skills = ', '.join(profile.skills.all().values_list('name', flat=True))
-
-        prompt = f"my name is {request.user.first_name} Generate cv like text. 150 characters. my skills are {skills}"
-        print(f'Skills: {skills}')
-
+        """Generate the about me text in the background, see about_me_status"""
         try:
-            # Send request to OpenAI API
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {get_openai_api_key()}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "Create about me text. for Job Seeker. language Georgian"
-                        },
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7
-                }
+            profile = JobSeekerProfile.objects.get(user=request.user)
+        except JobSeekerProfile.DoesNotExist:
+            return Response(
+                {"detail": "Profile not found for the user."},
+                status=status.HTTP_404_NOT_FOUND
             )
-            response.raise_for_status()
-
-            # Parse the OpenAI API response
-            about_me_data = response.json()
-            content = about_me_data["choices"][0]["message"]["content"]
-
-            # Update the JobSeekerProfile's about_me field
-            try:
-                profile = JobSeekerProfile.objects.get(user=request.user)
-                profile.about_me = content
-                profile.save()
 
-                return Response({
-                    "message": "About me generated and updated successfully.",
-                    "about_me": content
-                }, status=status.HTTP_200_OK)
+        skills = list(profile.skills.values_list('name', flat=True))
+        content = cache.get(openai_client.about_me_cache_key(request.user.first_name, skills))
+        if content is not None:
+            # Same name, skills and prompt as a previous generation
+            JobSeekerProfile.objects.filter(id=profile.id).update(about_me=content)
+            documents.invalidate(request.user.pk)
+            return Response({
+                "message": "About me generated and updated successfully.",
+                "about_me": content
+            }, status=status.HTTP_200_OK)
 
-            except JobSeekerProfile.DoesNotExist:
-                return Response(
-                    {"detail": "Profile not found for the user."},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+        task = tasks.generate_about_me.delay(profile.id)
+        cache.set(f"about_me_task:{request.user.id}", task.id, timeout=60 * 60)
+        return Response({
+            "message": "About me generation started.",
+            "task_id": task.id
+        }, status=status.HTTP_202_ACCEPTED)
 
-        except requests.exceptions.HTTPError as e:
-            print("HTTP error:", response.text)
-            return Response(
-                {"error": "OpenAI API error", "details": response.text},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        except (json.JSONDecodeError, KeyError) as e:
-            print("Invalid response format:", response.text)
+    @action(detail=False, methods=['GET'])
+    def about_me_status(self, request):
+        """Status of the user's last about me generation"""
+        task_id = cache.get(f"about_me_task:{request.user.id}")
+        if task_id is None:
             return Response(
-                {"error": "Invalid response from OpenAI", "details": response.text},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"detail": "No about me generation in progress."},
+                status=status.HTTP_404_NOT_FOUND
             )
 
+        result = AsyncResult(task_id)
+        data = {"task_id": task_id, "status": result.state}
+        if result.successful():
+            data["about_me"] = result.result["about_me"]
+        elif result.failed():
+            data["error"] = "About me generation failed, please try again."
+        return Response(data)
+
     def create(self, request, *args, **kwargs):
         if JobSeekerProfile.objects.filter(user=request.user).exists():
             return Response(
@@ -146,7 +205,7 @@ class JobSeekerProfileViewSet(viewsets.ModelViewSet):
         self.perform_create(serializer)
 
         response_data = {
-            'user': CustomUserSerializer(request.user).data,
+            'user': CustomUserSerializer(request.user, context=self.get_serializer_context()).data,
             'profile': serializer.data
         }
 
@@ -157,7 +216,7 @@ class JobSeekerProfileViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class EmployerProfileViewSet(viewsets.ModelViewSet):
+class EmployerProfileViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = EmployerProfile.objects.all()
     serializer_class = EmployerProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -168,7 +227,7 @@ class EmployerProfileViewSet(viewsets.ModelViewSet):
         return EmployerProfile.objects.all()
 
 
-class EducationViewSet(viewsets.ModelViewSet):
+class EducationViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Education.objects.all()
     serializer_class = EducationSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -177,7 +236,7 @@ class EducationViewSet(viewsets.ModelViewSet):
         return Education.objects.filter(profile__user=self.request.user)
 
 
-class WorkExperienceViewSet(viewsets.ModelViewSet):
+class WorkExperienceViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = WorkExperience.objects.all()
     serializer_class = WorkExperienceSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -240,88 +299,168 @@ class EmployerRegistrationView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SkillViewSet(viewsets.ModelViewSet):
-    queryset = Skill.objects.all()
-    serializer_class = SkillSerializer
+class TokenRevokeView(APIView):
+    """Log out: revoke the given refresh token and the access token in use"""
     permission_classes = [permissions.IsAuthenticated]
 
-    @action(detail=False, methods=['POST'])
-    def add_skills(self, request):
-        try:
-            # Get user profile
-            profile = JobSeekerProfile.objects.get(user=request.user)
+    def post(self, request):
+        serializer = TokenRevokeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        refresh = serializer.validated_data['refresh']
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(request.user.pk):
+            return Response(
+                {"error": "Token belongs to another user"},
+                status=status.HTTP_403_FORBIDDEN
+            )
 
-            # Get skill IDs from request
-            skill_ids = request.data.get('skills', [])
+        revocation.revoke(refresh, user=request.user)
+        if request.auth is not None:
+            revocation.revoke(request.auth, user=request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
-            # Verify skills exist
-            skills = Skill.objects.filter(id__in=skill_ids)
-            if len(skills) != len(skill_ids):
-                return Response(
-                    {"detail": "ზოგიერთი სკილი ვერ მოიძებნა"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
 
-            # Add new skills to existing ones
-            current_skills = set(profile.skills.values_list('id', flat=True))
-            new_skills = set(skill_ids)
-            all_skills = list(current_skills.union(new_skills))
+class BulkUserImportView(APIView):
+    """
+    Admin-only bulk account import, see accounts.bulk_import.
 
-            # Update profile skills
-            profile.skills.set(all_skills)
+    JSON ``{"user_type": ..., "company": id, "users": [...]}`` or a multipart
+    form with the same fields and a CSV ``file`` instead of ``users``. The
+    accounts are created by a Celery task, poll ``BulkUserImportStatusView``.
+    """
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [JSONParser, MultiPartParser]
 
-            # Return updated profile
-            serializer = JobSeekerProfileSerializer(profile)
-            return Response(serializer.data)
+    def post(self, request):
+        user_type = request.data.get('user_type')
+        if user_type not in dict(CustomUser.USER_TYPE_CHOICES):
+            return Response(
+                {"error": "user_type must be job_seeker or employer"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        except JobSeekerProfile.DoesNotExist:
+        company = None
+        if request.data.get('company'):
+            company = Company.objects.filter(id=request.data['company']).first()
+            if company is None:
+                return Response({"error": "Company not found"}, status=status.HTTP_404_NOT_FOUND)
+        if user_type == 'employer' and company is None:
+            return Response({"error": "Employer imports need a company"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if 'file' in request.FILES:
+            try:
+                rows = bulk_import.read_csv(request.FILES['file'])
+            except bulk_import.BulkImportError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            rows = request.data.get('users')
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {"error": "Send the accounts as a users list or a CSV file"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > bulk_import.MAX_ROWS:
+            return Response(
+                {"error": f"At most {bulk_import.MAX_ROWS} rows can be imported at once"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows_key = bulk_import.store_rows(rows)
+        task = tasks.import_users.delay(rows_key, user_type, company.id if company else None)
+        return Response({
+            "message": "Import started.",
+            "task_id": task.id
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class BulkUserImportStatusView(APIView):
+    """Status of a bulk import, with the created count and row errors once done"""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, task_id):
+        result = AsyncResult(task_id)
+        data = {"task_id": task_id, "status": result.state}
+        if result.successful():
+            data.update(result.result)
+        elif result.failed():
+            data["error"] = "Import failed, please try again."
+        return Response(data)
+
+
+class SkillViewSet(ConditionalGetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = Skill.objects.all()
+    serializer_class = SkillSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def _skill_delta(self, request):
+        """Profile id and the skill ids sent in the request"""
+        profile_id = JobSeekerProfile.objects.filter(user=request.user).values_list('id', flat=True).first()
+        skill_ids = request.data.get('skills', [])
+        if not isinstance(skill_ids, list):
+            skill_ids = [skill_ids]
+        try:
+            skill_ids = {int(skill_id) for skill_id in skill_ids}
+        except (TypeError, ValueError):
+            skill_ids = None
+        return profile_id, skill_ids
+
+    def _skills_response(self, profile_id):
+        through = JobSeekerProfile.skills.through
+        skill_ids = through.objects.filter(jobseekerprofile_id=profile_id).order_by('skill_id')
+        return Response({"skills": list(skill_ids.values_list('skill_id', flat=True))})
+
+    @action(detail=False, methods=['POST'])
+    def add_skills(self, request):
+        """Add skills to user profile"""
+        profile_id, skill_ids = self._skill_delta(request)
+        if profile_id is None:
             return Response(
                 {"detail": "პროფილი ვერ მოიძებნა"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        # Verify skills exist
+        if skill_ids is None or Skill.objects.filter(id__in=skill_ids).count() != len(skill_ids):
+            return Response(
+                {"detail": "ზოგიერთი სკილი ვერ მოიძებნა"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if skill_ids:
+            # Rows the profile already has are skipped by the database
+            through = JobSeekerProfile.skills.through
+            through.objects.bulk_create(
+                [through(jobseekerprofile_id=profile_id, skill_id=skill_id) for skill_id in skill_ids],
+                ignore_conflicts=True
+            )
+            # Bulk writes skip m2m_changed, drop the cached me document here
+            documents.invalidate(request.user.pk)
+        return self._skills_response(profile_id)
+
     @action(detail=False, methods=['POST'])
     def remove_skills(self, request):
         """Remove skills from user profile"""
-        try:
-            profile = JobSeekerProfile.objects.get(user=request.user)
-            skill_ids = request.data.get('skills', [])
-
-            # Remove specified skills
-            current_skills = set(profile.skills.values_list('id', flat=True))
-            skills_to_remove = set(skill_ids)
-            remaining_skills = list(current_skills - skills_to_remove)
-
-            profile.skills.set(remaining_skills)
-
-            serializer = JobSeekerProfileSerializer(profile)
-            return Response(serializer.data)
-        except JobSeekerProfile.DoesNotExist:
+        profile_id, skill_ids = self._skill_delta(request)
+        if profile_id is None:
             return Response(
                 {"detail": "Profile Not Found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        if skill_ids is None:
+            return Response(
+                {"detail": "skills must be a list of ids"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if skill_ids:
+            JobSeekerProfile.skills.through.objects.filter(
+                jobseekerprofile_id=profile_id, skill_id__in=skill_ids
+            ).delete()
+            documents.invalidate(request.user.pk)
+        return self._skills_response(profile_id)
 
     @action(detail=False, methods=['GET'])
     def by_category(self, request):
-        cache_key = "categorized_skills"
-        categorized_skills = cache.get(cache_key)
-
-        if not categorized_skills:
-            skills = Skill.objects.all()
-            categorized_skills = {}
-
-            for skill in skills:
-                if skill.category not in categorized_skills:
-                    categorized_skills[skill.category] = []
-
-                categorized_skills[skill.category].append({
-                    'id': skill.id,
-                    'name': skill.name,
-                    'created_at': skill.created_at
-                })
-
-            # Cache the result for 1 hour (3600 seconds)
-            cache.set(cache_key, categorized_skills, timeout=3600)
-
-        return Response(categorized_skills)
\ No newline at end of file
+        # The version changes whenever a skill does, see accounts.signals
+        categorized_skills, version = refdata.get_versioned('skills_by_category')
+        etag = make_etag(version, getattr(request.accepted_renderer, 'format', None))
+        return conditional_response(request, lambda: Response(categorized_skills), etag)
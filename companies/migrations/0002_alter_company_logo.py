@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:16
+
+import Jobily.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='company',
+            name='logo',
+            field=models.ImageField(blank=True, default='company_logos/default.png', storage=Jobily.storage.blob_storage, upload_to='company_logos/'),
+        ),
+    ]
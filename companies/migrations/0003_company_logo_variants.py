@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_alter_company_logo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
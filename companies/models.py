@@ -1,5 +1,6 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from Jobily.storage import blob_storage
 
 
 class Company(models.Model):
@@ -36,9 +37,12 @@ class Company(models.Model):
 
     logo = models.ImageField(
         upload_to='company_logos/',
+        storage=blob_storage,
         default='company_logos/default.png',
         blank=True
     )
+    # Resized WebP copies of the logo, see Jobily.images
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     location = models.CharField(max_length=200, blank=True)
     headquarters = models.CharField(max_length=200, blank=True)
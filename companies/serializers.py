@@ -2,6 +2,10 @@
 from rest_framework import serializers
 from django.db import transaction
 from accounts.models import CustomUser, EmployerProfile
+from Jobily.images import VariantImageField
+from Jobily.serializers import (
+    CompiledRepresentationMixin, FragmentCacheMixin, FragmentListSerializer, SparseFieldsetMixin
+)
 from .models import Company
 
 
@@ -51,15 +55,21 @@ class CompanyRegistrationSerializer(serializers.Serializer):
                 'user': user,
                 'company': company
             }
-class CompanySerializer(serializers.ModelSerializer):
+class CompanySerializer(FragmentCacheMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    logo = VariantImageField(required=False)
+
     class Meta:
         model = Company
-        fields = '__all__'
+        exclude = ('logo_variants',)
+        list_serializer_class = FragmentListSerializer
 
 
-class CompanyListSerializer(serializers.ModelSerializer):
+class CompanyListSerializer(FragmentCacheMixin, CompiledRepresentationMixin, SparseFieldsetMixin,
+                            serializers.ModelSerializer):
     """Serializer for listing companies with minimal information"""
+    # Employer changes touch Company.updated_at, see companies.signals
     employees_count = serializers.SerializerMethodField()
+    logo = VariantImageField(required=False)
 
     class Meta:
         model = Company
@@ -74,6 +84,7 @@ class CompanyListSerializer(serializers.ModelSerializer):
             'is_verified',
             'employees_count'
         ]
+        list_serializer_class = FragmentListSerializer
 
     def get_employees_count(self, obj):
         return obj.employers.count()
\ No newline at end of file
@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from Jobily import images, refdata
+from accounts.models import EmployerProfile
+from .models import Company
+from . import tasks
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def invalidate_company_filters(sender, **kwargs):
+    transaction.on_commit(lambda: refdata.invalidate('company_filters'))
+
+
+@receiver(post_save, sender=Company)
+def queue_logo_variants(sender, instance, **kwargs):
+    if images.needs_variants(instance, 'logo'):
+        transaction.on_commit(lambda: tasks.generate_logo_variants.delay(instance.pk))
+
+
+@receiver(pre_save, sender=EmployerProfile)
+def remember_previous_company(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_company_id = EmployerProfile.objects.filter(pk=instance.pk).values_list('company_id', flat=True).first()
+
+
+@receiver(post_save, sender=EmployerProfile)
+@receiver(post_delete, sender=EmployerProfile)
+def touch_employer_companies(sender, instance, **kwargs):
+    # employees_count is part of the company representation; update() keeps
+    # the Company save signals out of it
+    company_ids = {instance.company_id, getattr(instance, '_previous_company_id', None)} - {None}
+    Company.objects.filter(id__in=company_ids).update(updated_at=timezone.now())
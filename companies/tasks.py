@@ -0,0 +1,15 @@
+from celery import shared_task
+from Jobily import images
+from .models import Company
+
+
+@shared_task
+def generate_logo_variants(company_id, force=False):
+    """
+    კომპანიის ლოგოს შემცირებული WebP ვერსიების გენერაცია
+    """
+    company = Company.objects.filter(id=company_id).first()
+    if company is None:
+        return "Company not found"
+    generated = images.generate(company, 'logo', force=force)
+    return "Generated variants" if generated else "Variants are up to date"
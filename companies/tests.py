@@ -1,3 +1,51 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import CustomUser
+from .models import Company
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', industry='IT', location='Tbilisi', company_size='11-50')
+        Company.objects.create(name='Beta Soft', industry='Finance', location='Batumi', company_size='1-10')
+        cls.user = CustomUser.objects.create_user(
+            username='seeker', email='seeker@example.com', password='pw12345!', user_type='job_seeker'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.detail_url = f'/api/companies/{self.company.pk}/'
+
+    def test_matching_etag_returns_304(self):
+        for url in ('/api/companies/', self.detail_url):
+            etag = self.client.get(url)['ETag']
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_saving_a_company_changes_the_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in ('/api/companies/', self.detail_url)}
+        self.company.description = 'We build software'
+        self.company.save()
+        for url, etag in etags.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_recorded_variants_change_the_sized_etag(self):
+        params = {'image_size': 'small'}
+        etag = self.client.get(self.detail_url, params)['ETag']
+        plain_etag = self.client.get(self.detail_url)['ETag']
+        # What Jobily.images.generate records, without touching updated_at
+        Company.objects.filter(pk=self.company.pk).update(logo_variants={
+            'source': self.company.logo.name, 'small': 'variants/small.webp',
+        })
+        response = self.client.get(self.detail_url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=plain_etag).status_code, 304)
@@ -6,11 +6,24 @@ from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.db import transaction
+from Jobily import refdata
+from Jobily.mixins import BatchRetrieveMixin, ConditionalGetMixin, SparseFieldsetMixin
 from .models import Company
 from .serializers import CompanySerializer, CompanyRegistrationSerializer, CompanyListSerializer
 
 
-class CompanyViewSet(viewsets.ModelViewSet):
+@refdata.dataset('company_filters')
+def company_filters():
+    industries = Company.objects.values_list('industry', flat=True).distinct()
+    locations = Company.objects.values_list('location', flat=True).distinct()
+    return {
+        'industries': sorted(filter(None, industries)),
+        'locations': sorted(filter(None, locations)),
+        'company_sizes': dict(Company.COMPANY_SIZE_CHOICES)
+    }
+
+
+class CompanyViewSet(ConditionalGetMixin, SparseFieldsetMixin, BatchRetrieveMixin, viewsets.ModelViewSet):
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -66,15 +79,7 @@ class CompanyViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['GET'])
     def filters(self, request):
         """Get unique values for filters"""
-        industries = Company.objects.values_list('industry', flat=True).distinct()
-        locations = Company.objects.values_list('location', flat=True).distinct()
-        company_sizes = dict(Company.COMPANY_SIZE_CHOICES)
-
-        return Response({
-            'industries': sorted(filter(None, industries)),
-            'locations': sorted(filter(None, locations)),
-            'company_sizes': company_sizes
-        })
+        return Response(refdata.get('company_filters'))
 
 
 class CompanyRegistrationViewSet(viewsets.ViewSet):
@@ -0,0 +1,296 @@
+"""
+In-memory autocomplete over job titles, skill names and company names.
+
+Every term is kept in a sorted array of normalized keys, so a prefix lookup
+is two bisections plus a weighted top-k over the matching slice. The most
+popular completions for short (one or two letter) prefixes are precomputed
+because those slices are the largest.
+
+The index is shared between worker processes as a compressed snapshot in the
+cache, with the sorted keys and hot prefixes already built, so reloading it
+is a decode rather than a sort. Save signals queue incremental updates for
+the touched terms (see ``jobs.signals``) and each process reloads the
+snapshot on a background thread when its version changes. With no snapshot
+at all, requests get empty results while a Celery task builds one.
+"""
+import bisect
+import heapq
+import json
+import threading
+import time
+import zlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+SNAPSHOT_KEY = 'autocomplete:snapshot'
+VERSION_KEY = 'autocomplete:version'
+LOCK_KEY = 'autocomplete:lock'
+REBUILD_QUEUED_KEY = 'autocomplete:rebuild-queued'
+
+KINDS = ('title', 'skill', 'company')
+
+# How often a worker checks the cache for a newer snapshot (seconds)
+REFRESH_INTERVAL = 5
+HOT_PREFIX_LENGTH = 2
+HOT_PREFIX_LIMIT = 25
+MAX_LIMIT = 25
+
+
+def normalize(text):
+    return ' '.join(str(text).lower().split())
+
+
+class AutocompleteIndex:
+    """Sorted-array prefix index over weighted terms"""
+
+    def __init__(self, entries=None):
+        # (kind, ident) -> (label, weight)
+        self.entries = dict(entries or {})
+        self._build()
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = {(kind, ident): (label, weight) for kind, ident, label, weight in self._items}
+        return self._entries
+
+    @entries.setter
+    def entries(self, value):
+        self._entries = value
+
+    def _build(self):
+        self._items = [
+            (kind, ident, label, weight)
+            for (kind, ident), (label, weight) in self.entries.items()
+            if weight > 0
+        ]
+
+        # Every word start of a term is searchable: "Senior Python Developer"
+        # matches "sen", "pyt" and "dev"
+        keyed = []
+        for position, (kind, ident, label, weight) in enumerate(self._items):
+            words = normalize(label).split(' ')
+            for start in range(len(words)):
+                keyed.append((' '.join(words[start:]), position))
+        keyed.sort()
+        self._keys = [key for key, _ in keyed]
+        self._positions = [position for _, position in keyed]
+
+        hot = {}
+        for key, position in keyed:
+            for length in range(1, HOT_PREFIX_LENGTH + 1):
+                if len(key) >= length:
+                    hot.setdefault(key[:length], set()).add(position)
+        self._hot = {
+            prefix: heapq.nlargest(HOT_PREFIX_LIMIT, positions, key=self._rank)
+            for prefix, positions in hot.items()
+        }
+
+    def _rank(self, position):
+        kind, ident, label, weight = self._items[position]
+        return weight, -len(label)
+
+    def __len__(self):
+        return len(self._items)
+
+    def search(self, query, limit=10, kinds=None):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        if kinds is not None and not kinds:
+            return []
+
+        if len(prefix) <= HOT_PREFIX_LENGTH and kinds is None and limit <= HOT_PREFIX_LIMIT:
+            positions = self._hot.get(prefix, [])[:limit]
+        else:
+            lo = bisect.bisect_left(self._keys, prefix)
+            hi = bisect.bisect_left(self._keys, prefix + '\uffff', lo)
+            candidates = set(self._positions[lo:hi])
+            if kinds:
+                candidates = {p for p in candidates if self._items[p][0] in kinds}
+            positions = heapq.nlargest(limit, candidates, key=self._rank)
+
+        results = []
+        for position in positions:
+            kind, ident, label, weight = self._items[position]
+            results.append({
+                'type': kind,
+                'id': ident if kind != 'title' else None,
+                'label': label,
+                'weight': weight,
+            })
+        return results
+
+    def dumps(self):
+        tables = {
+            'items': self._items,
+            'keys': self._keys,
+            'positions': self._positions,
+            'hot': self._hot,
+        }
+        return zlib.compress(json.dumps(tables, separators=(',', ':')).encode())
+
+    @classmethod
+    def loads(cls, data):
+        """Restore a dumped index as built, without sorting again"""
+        tables = json.loads(zlib.decompress(data).decode())
+        index = cls.__new__(cls)
+        # Entries are derived from the items when an update needs them
+        index.entries = None
+        index._items = [tuple(item) for item in tables['items']]
+        index._keys = tables['keys']
+        index._positions = tables['positions']
+        index._hot = tables['hot']
+        return index
+
+
+def _title_entries(titles=None):
+    from .models import Job
+
+    queryset = Job.objects.filter(status='published')
+    if titles is not None:
+        queryset = queryset.filter(title__in=titles)
+    entries = {}
+    for row in queryset.values('title').annotate(weight=Count('id')):
+        ident = normalize(row['title'])
+        label, weight = entries.get(ident, (row['title'], 0))
+        entries[ident] = (label, weight + row['weight'])
+    return {('title', ident): value for ident, value in entries.items()}
+
+
+def _skill_entries(ids=None):
+    from accounts.models import Skill
+
+    queryset = Skill.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    queryset = queryset.annotate(
+        published_jobs=Count('jobs', filter=Q(jobs__status='published'))
+    ).values_list('id', 'name', 'published_jobs')
+    # Every existing skill stays searchable, popular ones rank first
+    return {('skill', pk): (name, count + 1) for pk, name, count in queryset}
+
+
+def _company_entries(ids=None):
+    from companies.models import Company
+
+    queryset = Company.objects.filter(is_active=True)
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    queryset = queryset.annotate(
+        published_jobs=Count('jobs', filter=Q(jobs__status='published'))
+    ).values_list('id', 'name', 'published_jobs')
+    return {('company', pk): (name, count + 1) for pk, name, count in queryset}
+
+
+ENTRY_BUILDERS = {
+    'title': _title_entries,
+    'skill': _skill_entries,
+    'company': _company_entries,
+}
+
+
+def build_entries():
+    entries = {}
+    for builder in ENTRY_BUILDERS.values():
+        entries.update(builder())
+    return entries
+
+
+def publish(index):
+    version = time.time_ns()
+    cache.set_many({SNAPSHOT_KEY: index.dumps(), VERSION_KEY: version}, timeout=None)
+    return version
+
+
+def rebuild():
+    """Rebuild the whole index from the database and publish it"""
+    index = AutocompleteIndex(build_entries())
+    publish(index)
+    return index
+
+
+def apply_changes(kind, idents):
+    """Recompute the given terms and publish the patched snapshot.
+
+    Returns False when another worker holds the update lock.
+    """
+    if not cache.add(LOCK_KEY, 1, timeout=30):
+        return False
+    try:
+        data = cache.get(SNAPSHOT_KEY)
+        if data is None:
+            rebuild()
+            return True
+
+        entries = AutocompleteIndex.loads(data).entries
+        fresh = ENTRY_BUILDERS[kind](idents)
+        if kind == 'title':
+            idents = [normalize(title) for title in idents]
+
+        for ident in idents:
+            entries.pop((kind, ident), None)
+        entries.update(fresh)
+        publish(AutocompleteIndex(entries))
+        return True
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def queue_rebuild():
+    """Queue a full rebuild, at most once a minute"""
+    from .tasks import rebuild_autocomplete_index
+
+    if cache.add(REBUILD_QUEUED_KEY, 1, timeout=60):
+        rebuild_autocomplete_index.delay()
+
+
+_local = {'index': None, 'version': None, 'checked_at': 0.0}
+_loading = threading.Lock()
+
+
+def _load(version):
+    data = cache.get(SNAPSHOT_KEY)
+    if data is None:
+        queue_rebuild()
+        return
+    index = AutocompleteIndex.loads(data)
+    _local.update(index=index, version=version)
+
+
+def _load_in_background(version):
+    try:
+        _load(version)
+    finally:
+        _loading.release()
+
+
+def get_index():
+    """
+    Return this process' index.
+
+    A newer snapshot is loaded on a background thread while requests keep
+    using the current one; only a process without a snapshot yet loads it
+    inline. With no snapshot in the cache the results are empty until the
+    queued rebuild publishes one.
+    """
+    now = time.monotonic()
+    if _local['index'] is not None and now - _local['checked_at'] < REFRESH_INTERVAL:
+        return _local['index']
+
+    _local['checked_at'] = now
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        queue_rebuild()
+    elif version != _local['version']:
+        if _local['version'] is None:
+            _load(version)
+        elif _loading.acquire(blocking=False):
+            threading.Thread(target=_load_in_background, args=(version,), daemon=True).start()
+
+    if _local['index'] is None:
+        _local['index'] = AutocompleteIndex()
+    return _local['index']
@@ -0,0 +1,231 @@
+"""
+Partner XML feed and sitemaps for published jobs.
+
+Jobs are split into shards of ``SHARD_SIZE`` ids. Each shard has one feed
+file and one sitemap file in the default storage, next to index files that
+list them. A manifest keeps the latest ``updated_at`` and row count of every
+shard and the time of the last run. A rebuild only looks at the jobs saved
+and the tombstones recorded since then (through the ``updated_at`` and
+``deleted_at`` indexes) and rewrites the shards they fall into. Files are
+replaced with a rename, so readers never see a missing or partial file. The
+files are served by the web server straight from storage and carry the
+Last-Modified of their last rewrite.
+"""
+import json
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .models import Job, JobTombstone
+
+# Sitemaps allow at most 50k URLs per file
+SHARD_SIZE = 50000
+CHUNK_SIZE = 2000
+
+MANIFEST_NAME = 'feeds/manifest.json'
+FEED_INDEX_NAME = 'feeds/index.xml'
+SITEMAP_INDEX_NAME = 'sitemaps/sitemap-index.xml'
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+# Rows saved just before a run may commit after it, they are looked at again
+DIRTY_OVERLAP = timedelta(minutes=1)
+# Characters XML 1.0 doesn't allow, even escaped
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def feed_name(shard):
+    return f'feeds/jobs-{shard}.xml'
+
+
+def sitemap_name(shard):
+    return f'sitemaps/jobs-{shard}.xml'
+
+
+def job_url(job_id):
+    return f"{settings.SITE_URL}/jobs/{job_id}/"
+
+
+def file_url(name):
+    url = default_storage.url(name)
+    return f"{settings.SITE_URL}{url}" if url.startswith('/') else url
+
+
+def _text(value):
+    return INVALID_XML_CHARS.sub('', value)
+
+
+def _save(name, file):
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        # Remote storages replace objects in one request
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, file)
+        return
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.tmp-', delete=False) as handle:
+        for chunk in file.chunks():
+            handle.write(chunk)
+    os.chmod(handle.name, default_storage.file_permissions_mode or 0o644)
+    os.replace(handle.name, path)
+
+
+def _write_xml(name, write):
+    with tempfile.TemporaryFile() as handle:
+        xml = SimplerXMLGenerator(handle, 'utf-8')
+        xml.startDocument()
+        write(xml)
+        xml.endDocument()
+        handle.seek(0)
+        _save(name, File(handle))
+
+
+def load_manifest():
+    if not default_storage.exists(MANIFEST_NAME):
+        return None
+    with default_storage.open(MANIFEST_NAME) as handle:
+        manifest = json.load(handle)
+    # Manifests of older builds only held the shards, start over
+    return manifest if 'shards' in manifest else None
+
+
+def shard_states(shards=None):
+    """Latest updated_at and job count per shard (all or ``shards``), in one aggregate query"""
+    jobs = Job.objects.all()
+    if shards is not None:
+        ranges = Q(pk__in=[])
+        for shard in shards:
+            ranges |= Q(id__gte=int(shard) * SHARD_SIZE, id__lt=(int(shard) + 1) * SHARD_SIZE)
+        jobs = jobs.filter(ranges)
+    rows = jobs.annotate(shard=F('id') / SHARD_SIZE).values('shard').annotate(
+        last=Max('updated_at'), count=Count('id')
+    ).order_by('shard')
+    return {str(row['shard']): {'last': row['last'].isoformat(), 'count': row['count']} for row in rows}
+
+
+def dirty_shards(since):
+    """Shards with jobs saved or deleted after ``since``"""
+    saved = Job.objects.filter(updated_at__gt=since).annotate(
+        shard=F('id') / SHARD_SIZE
+    ).order_by().values_list('shard', flat=True).distinct()
+    deleted = JobTombstone.objects.filter(deleted_at__gt=since).values_list('job_id', flat=True)
+    return {str(shard) for shard in saved} | {str(job_id // SHARD_SIZE) for job_id in deleted}
+
+
+def _shard_jobs(shard):
+    return Job.objects.filter(
+        status='published', id__gte=shard * SHARD_SIZE, id__lt=(shard + 1) * SHARD_SIZE
+    ).select_related('company').order_by('id')
+
+
+def write_feed_shard(shard):
+    def write(xml):
+        xml.startElement('jobs', {})
+        for job in _shard_jobs(shard).iterator(chunk_size=CHUNK_SIZE):
+            xml.startElement('job', {'id': str(job.id)})
+            xml.addQuickElement('title', _text(job.title))
+            xml.addQuickElement('url', job_url(job.id))
+            xml.addQuickElement('company', _text(job.company.name))
+            xml.addQuickElement('location', _text(job.location))
+            xml.addQuickElement('job_type', job.job_type)
+            xml.addQuickElement('experience_level', job.experience_level)
+            xml.addQuickElement('is_remote', 'true' if job.is_remote else 'false')
+            if job.salary_min is not None:
+                xml.addQuickElement('salary_min', str(job.salary_min))
+            if job.salary_max is not None:
+                xml.addQuickElement('salary_max', str(job.salary_max))
+            xml.addQuickElement('description', _text(job.description))
+            xml.addQuickElement('created_at', job.created_at.isoformat())
+            xml.addQuickElement('updated_at', job.updated_at.isoformat())
+            if job.expires_at:
+                xml.addQuickElement('expires_at', job.expires_at.isoformat())
+            xml.endElement('job')
+        xml.endElement('jobs')
+
+    _write_xml(feed_name(shard), write)
+
+
+def write_sitemap_shard(shard):
+    def write(xml):
+        xml.startElement('urlset', {'xmlns': SITEMAP_NS})
+        jobs = _shard_jobs(shard).values_list('id', 'updated_at')
+        for job_id, updated_at in jobs.iterator(chunk_size=CHUNK_SIZE):
+            xml.startElement('url', {})
+            xml.addQuickElement('loc', job_url(job_id))
+            xml.addQuickElement('lastmod', updated_at.date().isoformat())
+            xml.endElement('url')
+        xml.endElement('urlset')
+
+    _write_xml(sitemap_name(shard), write)
+
+
+def write_indexes(manifest):
+    shards = sorted(manifest, key=int)
+
+    def write_sitemap_index(xml):
+        xml.startElement('sitemapindex', {'xmlns': SITEMAP_NS})
+        for shard in shards:
+            xml.startElement('sitemap', {})
+            xml.addQuickElement('loc', file_url(sitemap_name(shard)))
+            xml.addQuickElement('lastmod', parse_datetime(manifest[shard]['last']).date().isoformat())
+            xml.endElement('sitemap')
+        xml.endElement('sitemapindex')
+
+    def write_feed_index(xml):
+        xml.startElement('feeds', {})
+        for shard in shards:
+            xml.addQuickElement('feed', file_url(feed_name(shard)), {
+                'updated_at': manifest[shard]['last'],
+            })
+        xml.endElement('feeds')
+
+    _write_xml(SITEMAP_INDEX_NAME, write_sitemap_index)
+    _write_xml(FEED_INDEX_NAME, write_feed_index)
+
+
+def build(full=False):
+    """
+    Rewrite the shards that changed since the last build (all of them with
+    ``full``) and return the list of rewritten shard numbers.
+    """
+    started = timezone.now()
+    manifest = None if full else load_manifest()
+    if manifest is None:
+        previous = load_manifest() or {'shards': {}}
+        states = shard_states()
+        changed = list(states)
+        removed = [shard for shard in previous['shards'] if shard not in states]
+    else:
+        states = dict(manifest['shards'])
+        dirty = dirty_shards(parse_datetime(manifest['since']) - DIRTY_OVERLAP)
+        fresh = shard_states(dirty) if dirty else {}
+        changed = [shard for shard, state in fresh.items() if states.get(shard) != state]
+        removed = [shard for shard in dirty if shard not in fresh and shard in states]
+        states.update(fresh)
+        for shard in removed:
+            del states[shard]
+
+    for shard in changed:
+        write_feed_shard(int(shard))
+        write_sitemap_shard(int(shard))
+    for shard in removed:
+        for name in (feed_name(shard), sitemap_name(shard)):
+            if default_storage.exists(name):
+                default_storage.delete(name)
+
+    if changed or removed or not default_storage.exists(SITEMAP_INDEX_NAME):
+        write_indexes(states)
+    _save(MANIFEST_NAME, ContentFile(json.dumps({'since': started.isoformat(), 'shards': states}).encode()))
+
+    return [int(shard) for shard in changed]
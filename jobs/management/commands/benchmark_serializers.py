@@ -0,0 +1,87 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import EmployerProfile
+from companies.models import Company
+from companies.serializers import CompanyListSerializer
+from jobs.models import Job
+from jobs.serializers import JobListSerializer
+
+
+def make_companies(count):
+    companies = []
+    now = timezone.now()
+    for pk in range(1, count + 1):
+        company = Company(
+            id=pk, name=f'Company {pk}', industry='IT', location='Tbilisi',
+            company_size='11-50', website=f'https://company{pk}.ge',
+            logo='company_logos/default.png', created_at=now, updated_at=now,
+        )
+        # employees_count reads the prefetched relation instead of the database
+        employers = EmployerProfile.objects.none()
+        employers._result_cache = []
+        company._prefetched_objects_cache = {'employers': employers}
+        companies.append(company)
+    return companies
+
+
+def make_jobs(count):
+    company = make_companies(1)[0]
+    now = timezone.now()
+    return [
+        Job(
+            id=pk, title=f'Python Developer {pk}', company=company, location='Tbilisi',
+            job_type='full_time', experience_level='mid', salary_type='range',
+            salary_min=Decimal('1500.00') + pk, salary_max=Decimal('3000.50'),
+            is_remote=bool(pk % 2), created_at=now, updated_at=now,
+        )
+        for pk in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Compares the generic and compiled representation of list serializers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        for serializer_class, factory in ((JobListSerializer, make_jobs), (CompanyListSerializer, make_companies)):
+            # The fragment cache is switched off so only rendering is measured
+            generic = type(f'Generic{serializer_class.__name__}', (serializer_class,), {
+                'compiled_representation': False, 'cache_fragments': False,
+            })
+            compiled = type(f'Compiled{serializer_class.__name__}', (serializer_class,), {
+                'cache_fragments': False,
+            })
+
+            for rows in options['rows']:
+                objects = factory(rows)
+                generic_time, generic_json = self.measure(generic, objects, options['repeat'])
+                compiled_time, compiled_json = self.measure(compiled, objects, options['repeat'])
+
+                if generic_json != compiled_json:
+                    self.stdout.write(self.style.ERROR(
+                        f'{serializer_class.__name__}: compiled output differs at {rows} rows'
+                    ))
+                    continue
+
+                self.stdout.write(self.style.SUCCESS(
+                    f'{serializer_class.__name__:<24} {rows:>6} rows  '
+                    f'generic {generic_time * 1000:8.1f} ms  compiled {compiled_time * 1000:8.1f} ms  '
+                    f'speedup {generic_time / compiled_time:4.2f}x'
+                ))
+
+    def measure(self, serializer_class, objects, repeat):
+        best, output = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = JSONRenderer().render(serializer_class(objects, many=True).data)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, output
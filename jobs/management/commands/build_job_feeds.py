@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from jobs import feeds
+
+
+class Command(BaseCommand):
+    help = 'Builds the partner XML feed and sitemaps for published jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rewrite every shard, not only changed ones')
+
+    def handle(self, *args, **options):
+        shards = feeds.build(full=options['full'])
+        if shards:
+            self.stdout.write(self.style.SUCCESS(f'Rewrote shards: {", ".join(map(str, shards))}'))
+        else:
+            self.stdout.write(self.style.WARNING('No shard changed'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from Jobily import storage
+
+
+class Command(BaseCommand):
+    help = 'Deletes uploaded blobs that no resume, logo or profile picture references'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=storage.GARBAGE_GRACE,
+                            help='Keep blobs modified within this many seconds')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the blobs')
+
+    def handle(self, *args, **options):
+        removed = storage.collect_garbage(grace=options['grace'], dry_run=options['dry_run'])
+        for name in removed:
+            self.stdout.write(name)
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(removed)} blobs'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from Jobily.caching import invalidate_tags
+from jobs import skill_tagging
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Attaches the skills mentioned in job texts to existing jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the skills that would be attached')
+
+    def handle(self, *args, **options):
+        through = Job.skills.through
+        tagged_jobs = attached = 0
+        last_id = 0
+        while True:
+            batch = list(
+                Job.objects.filter(id__gt=last_id).order_by('id').only(
+                    'id', 'title', 'description', 'requirements', 'responsibilities'
+                ).prefetch_related('skills')[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            rows = [
+                through(job_id=job.id, skill_id=skill_id)
+                for job in batch for skill_id in skill_tagging.missing_skills(job)
+            ]
+            job_ids = {row.job_id for row in rows}
+            tagged_jobs += len(job_ids)
+            attached += len(rows)
+            if rows and not options['dry_run']:
+                with transaction.atomic():
+                    through.objects.bulk_create(rows, ignore_conflicts=True)
+                    # Bulk inserts send no m2m signals; a new updated_at refreshes
+                    # fragments, feeds and sync cursors
+                    Job.objects.filter(id__in=job_ids).update(updated_at=timezone.now())
+
+        if attached and not options['dry_run']:
+            invalidate_tags('jobs')
+        verb = 'Would attach' if options['dry_run'] else 'Attached'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {attached} skills to {tagged_jobs} jobs'))
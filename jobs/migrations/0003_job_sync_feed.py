@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 17:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('companies', '0001_initial'),
+        ('jobs', '0002_job_jobapplication_delete_skill_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job_id', models.BigIntegerField()),
+                ('company_id', models.BigIntegerField(null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['updated_at', 'id'], name='jobs_job_updated_bd6fb0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jobtombstone',
+            index=models.Index(fields=['deleted_at'], name='jobs_jobtom_deleted_69dc6e_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:16
+
+import Jobily.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0003_job_sync_feed'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobapplication',
+            name='resume',
+            field=models.FileField(blank=True, null=True, storage=Jobily.storage.blob_storage, upload_to='job_applications/resumes/'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-19 18:36
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_published_at(apps, schema_editor):
+    # Closed jobs were normally published before, drafts and archives unknown
+    Job = apps.get_model('jobs', 'Job')
+    Job.objects.filter(status__in=['published', 'closed']).update(published_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0004_alter_jobapplication_resume'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='published_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_published_at, migrations.RunPython.noop),
+    ]
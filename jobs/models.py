@@ -1,7 +1,9 @@
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from companies.models import Company
 from accounts.models import Skill, CustomUser
+from Jobily.storage import blob_storage
 
 
 class Job(models.Model):
@@ -58,6 +60,8 @@ class Job(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     expires_at = models.DateTimeField(null=True, blank=True)
+    # First time the job went public, the change feed only reports these
+    published_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     views_count = models.PositiveIntegerField(default=0)
     applications_count = models.PositiveIntegerField(default=0)
@@ -68,11 +72,36 @@ class Job(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['status']),
             models.Index(fields=['company']),
+            # Keyset order of the change feed
+            models.Index(fields=['updated_at', 'id']),
         ]
 
     def __str__(self):
         return f"{self.title} at {self.company.name}"
 
+    def save(self, *args, **kwargs):
+        if self.status == 'published' and self.published_at is None:
+            self.published_at = timezone.now()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'published_at'}
+        super().save(*args, **kwargs)
+
+
+class JobTombstone(models.Model):
+    """Deleted job, kept so the change feed can report the deletion"""
+    job_id = models.BigIntegerField()
+    company_id = models.BigIntegerField(null=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Job {self.job_id} deleted at {self.deleted_at}"
+
 
 class JobApplication(models.Model):
     STATUS_CHOICES = [
@@ -88,7 +117,7 @@ class JobApplication(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
 
     cover_letter = models.TextField(blank=True)
-    resume = models.FileField(upload_to='job_applications/resumes/', null=True, blank=True)
+    resume = models.FileField(upload_to='job_applications/resumes/', storage=blob_storage, null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
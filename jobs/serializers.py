@@ -3,8 +3,16 @@ from accounts.models import Skill
 from .models import Job, JobApplication
 from accounts.serializers import SkillSerializer
 from companies.serializers import CompanyListSerializer
+from Jobily.images import VariantImageField
+from Jobily.serializers import (
+    CompiledRepresentationMixin, FragmentCacheMixin, FragmentListSerializer, SparseFieldsetMixin
+)
+
+class JobSerializer(FragmentCacheMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    # Skill renames don't touch Job.updated_at, so only the nested company
+    # and skill fragments are cached
+    cache_fragments = False
 
-class JobSerializer(serializers.ModelSerializer):
     skills = SkillSerializer(many=True, read_only=True)
     company = CompanyListSerializer(read_only=True)
     skills_ids = serializers.PrimaryKeyRelatedField(
@@ -15,6 +23,7 @@ class JobSerializer(serializers.ModelSerializer):
         model = Job
         fields = '__all__'
         read_only_fields = ('views_count', 'applications_count', 'posted_by')
+        list_serializer_class = FragmentListSerializer
 
     def create(self, validated_data):
         skills = validated_data.pop('skills', [])
@@ -22,9 +31,12 @@ class JobSerializer(serializers.ModelSerializer):
         job.skills.set(skills)
         return job
 
-class JobListSerializer(serializers.ModelSerializer):
+class JobListSerializer(FragmentCacheMixin, CompiledRepresentationMixin, SparseFieldsetMixin,
+                        serializers.ModelSerializer):
+    fragment_version_fields = ('updated_at', 'company.updated_at')
+
     company_name = serializers.CharField(source='company.name')
-    company_logo = serializers.ImageField(source='company.logo')
+    company_logo = VariantImageField(source='company.logo')
 
     class Meta:
         model = Job
@@ -33,8 +45,9 @@ class JobListSerializer(serializers.ModelSerializer):
             'job_type', 'salary_min', 'salary_max', 'created_at',
             'is_remote'
         ]
+        list_serializer_class = FragmentListSerializer
 
-class JobApplicationSerializer(serializers.ModelSerializer):
+class JobApplicationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = JobApplication
         fields = '__all__'
@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+from Jobily import refdata
+from Jobily.caching import invalidate_tags
+from accounts.models import Skill
+from companies.models import Company
+from .models import Job, JobApplication, JobTombstone
+from .tasks import extract_application_resume, update_autocomplete_terms
+
+# Job fields that change what the autocomplete index shows for a job
+AUTOCOMPLETE_FIELDS = {'title', 'status', 'company'}
+# Counters bumped on every view, not worth retiring cached actions for
+COUNTER_FIELDS = {'views_count', 'applications_count'}
+
+
+def _queue_autocomplete_update(kind, idents):
+    idents = [ident for ident in idents if ident is not None]
+    if idents:
+        transaction.on_commit(lambda: update_autocomplete_terms.delay(kind, idents))
+
+
+def _touches_autocomplete(update_fields):
+    return update_fields is None or bool(AUTOCOMPLETE_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=Job)
+def remember_previous_title(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and _touches_autocomplete(update_fields):
+        instance._previous_title = Job.objects.filter(pk=instance.pk).values_list('title', flat=True).first()
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def refresh_job_autocomplete(sender, instance, update_fields=None, **kwargs):
+    if not _touches_autocomplete(update_fields):
+        return
+    titles = {instance.title, getattr(instance, '_previous_title', None)}
+    _queue_autocomplete_update('title', list(titles))
+    _queue_autocomplete_update('company', [instance.company_id])
+
+
+@receiver(post_delete, sender=Job)
+def record_job_tombstone(sender, instance, **kwargs):
+    # Jobs that were never public aren't in any client's copy
+    if instance.published_at is not None:
+        JobTombstone.objects.create(job_id=instance.pk, company_id=instance.company_id)
+
+
+@receiver(m2m_changed, sender=Job.skills.through)
+def refresh_job_skills_autocomplete(sender, instance, action, reverse, pk_set=None, **kwargs):
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _queue_autocomplete_update('skill', [instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        _queue_autocomplete_update('skill', list(pk_set or ()))
+    elif action == 'pre_clear':
+        _queue_autocomplete_update('skill', list(instance.skills.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def refresh_skill_autocomplete(sender, instance, **kwargs):
+    _queue_autocomplete_update('skill', [instance.pk])
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+def invalidate_skill_patterns(sender, **kwargs):
+    # Rebuilds the tagging automaton in every process, see jobs.skill_tagging
+    transaction.on_commit(lambda: refdata.invalidate('skill_patterns'))
+
+
+@receiver(post_save, sender=Company)
+@receiver(post_delete, sender=Company)
+def refresh_company_autocomplete(sender, instance, **kwargs):
+    _queue_autocomplete_update('company', [instance.pk])
+
+
+def _invalidate_on_commit(*tags):
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+@receiver(post_save, sender=Job)
+@receiver(post_delete, sender=Job)
+def invalidate_job_actions(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= COUNTER_FIELDS:
+        return
+    _invalidate_on_commit('jobs', f'company-jobs:{instance.company_id}')
+
+
+@receiver(m2m_changed, sender=Job.skills.through)
+def invalidate_job_skill_actions(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate_on_commit('jobs')
+
+
+@receiver(post_save, sender=Company)
+def invalidate_company_job_actions(sender, instance, **kwargs):
+    # Job lists show the company name and logo
+    _invalidate_on_commit('jobs')
+
+
+@receiver(post_save, sender=JobApplication)
+@receiver(post_delete, sender=JobApplication)
+def invalidate_application_actions(sender, instance, **kwargs):
+    company_id = Job.objects.filter(id=instance.job_id).values_list('company_id', flat=True).first()
+    if company_id is not None:
+        _invalidate_on_commit(f'company-jobs:{company_id}')
+
+
+@receiver(post_save, sender=JobApplication)
+def queue_resume_extraction(sender, instance, created, **kwargs):
+    if created and instance.resume:
+        transaction.on_commit(lambda: extract_application_resume.delay(instance.pk))
@@ -0,0 +1,160 @@
+"""
+Skill tagging of job texts.
+
+Employers often mention skills in the description or requirements without
+selecting them. An Aho-Corasick automaton over every skill name and its
+synonyms (``SKILL_SYNONYMS`` in settings) finds all of them in one linear
+pass over the text, however many skills exist.
+
+Matches must stand as whole words, and names of up to two characters ("R")
+must also match case, so ordinary words don't turn into skills. Names that
+are ordinary words too (``SKILL_AMBIGUOUS_NAMES``: "Go", "Swift", "React")
+must match case and are ignored as the first word of a sentence. The
+patterns are the ``skill_patterns`` reference dataset (``Jobily.refdata``),
+and the automaton is rebuilt only when its version changes, i.e. when a
+skill is saved or deleted (see ``jobs.signals``).
+"""
+import threading
+from collections import deque
+
+from django.conf import settings
+
+from accounts.models import Skill
+from Jobily import refdata
+
+# Names this short only match with the same case
+CASE_SENSITIVE_MAX_LENGTH = 2
+
+
+def _lower(text):
+    # Per character, so offsets stay aligned with the original text
+    return ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+def _starts_sentence(text, start):
+    position = start - 1
+    while position >= 0 and text[position] in ' \t"\'(':
+        position -= 1
+    return position < 0 or text[position] in '.!?\r\n'
+
+
+class Automaton:
+    def __init__(self, patterns, ambiguous=()):
+        """
+        ``patterns`` is an iterable of ``(pattern, value)`` pairs, the
+        ``ambiguous`` ones match more strictly
+        """
+        self.ambiguous = frozenset(ambiguous)
+        self.goto = [{}]
+        self.fail = [0]
+        # Per state: (pattern, value) pairs ending there
+        self.output = [[]]
+        for pattern, value in patterns:
+            self._add(pattern, value)
+        self._link()
+
+    def _add(self, pattern, value):
+        state = 0
+        for char in _lower(pattern):
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append((pattern, value))
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def scan(self, text):
+        """Yield ``(start, end, pattern, value)`` of whole-word matches in ``text``"""
+        state = 0
+        for end, char in enumerate(_lower(text), 1):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for pattern, value in self.output[state]:
+                start = end - len(pattern)
+                if start > 0 and _is_word_char(text[start - 1]) and _is_word_char(pattern[0]):
+                    continue
+                if end < len(text) and _is_word_char(text[end]) and _is_word_char(pattern[-1]):
+                    continue
+                strict = pattern in self.ambiguous
+                if (strict or len(pattern) <= CASE_SENSITIVE_MAX_LENGTH) and text[start:end] != pattern:
+                    continue
+                if strict and _starts_sentence(text, start):
+                    continue
+                yield start, end, pattern, value
+
+
+@refdata.dataset('skill_patterns')
+def skill_patterns():
+    synonyms = getattr(settings, 'SKILL_SYNONYMS', {})
+    patterns = []
+    for skill_id, name in Skill.objects.values_list('id', 'name'):
+        patterns.append((name, skill_id))
+        patterns.extend((synonym, skill_id) for synonym in synonyms.get(name, ()))
+    return patterns
+
+
+_lock = threading.Lock()
+_built = (None, None)
+
+
+def get_automaton():
+    global _built
+    patterns, version = refdata.get_versioned('skill_patterns')
+    built_version, automaton = _built
+    if built_version != version:
+        with _lock:
+            built_version, automaton = _built
+            if built_version != version:
+                automaton = Automaton(patterns, getattr(settings, 'SKILL_AMBIGUOUS_NAMES', ()))
+                _built = (version, automaton)
+    return automaton
+
+
+def extract(*texts):
+    """Ids of the skills mentioned in ``texts``"""
+    automaton = get_automaton()
+    skill_ids = set()
+    for text in texts:
+        if not text:
+            continue
+        # Overlapping matches keep the longest, "React Native" isn't "React"
+        matches = sorted(automaton.scan(text), key=lambda match: (match[0], match[0] - match[1]))
+        selected, covered = None, 0
+        for start, end, _, value in matches:
+            if (start, end) == selected:
+                # Another skill with the same name or synonym
+                skill_ids.add(value)
+            elif start >= covered:
+                selected, covered = (start, end), end
+                skill_ids.add(value)
+    return skill_ids
+
+
+def job_texts(job):
+    return job.title, job.description, job.requirements, job.responsibilities
+
+
+def missing_skills(job, extracted=None):
+    """Ids of the skills mentioned in ``job`` but not attached to it"""
+    extracted = extract(*job_texts(job)) if extracted is None else extracted
+    return extracted - {skill.pk for skill in job.skills.all()}
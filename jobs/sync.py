@@ -0,0 +1,90 @@
+"""
+Change feed for partners and the mobile app.
+
+The cursor is an opaque token holding the ``(updated_at, id)`` of the last
+job returned, the id of the last tombstone and the time it was issued
+(tombstones are pruned after ``TOMBSTONE_RETENTION``). Every poll is a keyset
+scan over the ``(updated_at, id)`` index and costs the number of changes,
+not the size of the catalogue.
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Job, JobTombstone
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+# Rows saved in the last moments may still be committing with an earlier
+# updated_at, they are left for the next poll
+SAFETY_LAG = timedelta(seconds=2)
+TOMBSTONE_RETENTION = timedelta(days=30)
+
+
+class CursorError(ValueError):
+    pass
+
+
+class CursorExpired(CursorError):
+    pass
+
+
+def encode_cursor(updated_at, job_id, tombstone_id):
+    payload = json.dumps({
+        'u': updated_at.isoformat() if updated_at else None,
+        'j': job_id,
+        't': tombstone_id,
+        'i': timezone.now().isoformat(),
+    }, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None, 0, 0
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        updated_at = parse_datetime(payload['u']) if payload['u'] else None
+        job_id, tombstone_id = int(payload['j']), int(payload['t'])
+        issued_at = parse_datetime(payload['i'])
+    except (ValueError, KeyError, TypeError):
+        raise CursorError("Invalid cursor")
+    if issued_at is None or issued_at < timezone.now() - TOMBSTONE_RETENTION:
+        raise CursorExpired("Cursor is older than the tombstone retention, sync from scratch")
+    return updated_at, job_id, tombstone_id
+
+
+def changes_since(cursor, limit=DEFAULT_LIMIT):
+    """
+    Return ``(jobs, tombstones, next_cursor, has_more)`` after ``cursor``.
+
+    ``jobs`` holds every job saved since the cursor whatever its status;
+    the caller decides which ones count as removed.
+    """
+    updated_at, job_id, tombstone_id = decode_cursor(cursor)
+    limit = max(1, min(limit, MAX_LIMIT))
+    horizon = timezone.now() - SAFETY_LAG
+
+    jobs = Job.objects.filter(updated_at__lte=horizon)
+    if updated_at is not None:
+        jobs = jobs.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=job_id))
+    jobs = list(
+        jobs.select_related('company').prefetch_related('skills').order_by('updated_at', 'id')[:limit + 1]
+    )
+
+    tombstones = list(
+        JobTombstone.objects.filter(id__gt=tombstone_id, deleted_at__lte=horizon).order_by('id')[:limit + 1]
+    )
+
+    has_more = len(jobs) > limit or len(tombstones) > limit
+    jobs, tombstones = jobs[:limit], tombstones[:limit]
+
+    if jobs:
+        updated_at, job_id = jobs[-1].updated_at, jobs[-1].id
+    if tombstones:
+        tombstone_id = tombstones[-1].id
+    return jobs, tombstones, encode_cursor(updated_at, job_id, tombstone_id), has_more
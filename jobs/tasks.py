@@ -2,7 +2,10 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.utils import timezone
 from django.template.loader import render_to_string
-from .models import Job, JobApplication
+from .models import Job, JobApplication, JobTombstone
+from Jobily import storage
+from accounts import resume_text
+from . import autocomplete, feeds, sync
 
 
 @shared_task
@@ -69,4 +72,68 @@ def update_job_views(job_id):
         job.save(update_fields=['views_count'])
         return f"Views updated for job {job_id}"
     except Job.DoesNotExist:
-        return f"Job {job_id} not found"
\ No newline at end of file
+        return f"Job {job_id} not found"
+
+
+@shared_task(bind=True, max_retries=5)
+def update_autocomplete_terms(self, kind, idents):
+    """
+    ავტოდასრულების ინდექსში ცვლილებების ასახვა
+    """
+    if not autocomplete.apply_changes(kind, idents):
+        # Another worker is publishing a snapshot, try again shortly
+        raise self.retry(countdown=2)
+    return f"Autocomplete updated for {len(idents)} {kind} terms"
+
+
+@shared_task
+def rebuild_autocomplete_index():
+    """
+    ავტოდასრულების ინდექსის სრული გადაწყობა
+    """
+    index = autocomplete.rebuild()
+    return f"Autocomplete index rebuilt with {len(index)} terms"
+
+
+@shared_task
+def prune_job_tombstones():
+    """
+    ძველი წაშლის ჩანაწერების გასუფთავება
+    """
+    cutoff = timezone.now() - sync.TOMBSTONE_RETENTION
+    deleted, _ = JobTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return f"Pruned {deleted} job tombstones"
+
+
+@shared_task
+def build_job_feeds(full=False):
+    """
+    პარტნიორების XML ფიდის და sitemap-ების განახლება
+    """
+    shards = feeds.build(full=full)
+    return f"Rewrote {len(shards)} feed shards"
+
+
+@shared_task
+def cleanup_blobs():
+    """
+    ატვირთული ფაილების გასუფთავება, რომლებსაც აღარავინ იყენებს
+    """
+    removed = storage.collect_garbage()
+    return f"Removed {len(removed)} unreferenced blobs"
+
+
+@shared_task(soft_time_limit=60, time_limit=90)
+def extract_application_resume(application_id):
+    """
+    აპლიკაციის რეზიუმეს ტექსტის ამოღება
+    """
+    application = JobApplication.objects.filter(id=application_id).first()
+    if application is None or not application.resume:
+        return "No resume to extract"
+    try:
+        # Shared blobs (e.g. the profile resume) are extracted only once
+        text = resume_text.get_text(application.resume)
+    except (resume_text.ExtractionError, OSError) as e:
+        return f"Skipped: {e}"
+    return f"Extracted {len(text.text)} characters"
@@ -1,3 +1,194 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser, EmployerProfile
+from companies.models import Company
+from . import skill_tagging, sync
+from .autocomplete import AutocompleteIndex
+from .models import Job
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def create_job(company, employer, **fields):
+    values = {
+        'title': 'Python Developer', 'location': 'Tbilisi', 'job_type': 'full_time', 'experience_level': 'mid',
+        'description': 'x', 'requirements': 'x', 'responsibilities': 'x', 'salary_type': 'range',
+        'status': 'published',
+    }
+    values.update(fields)
+    return Job.objects.create(company=company, posted_by=employer, **values)
+
+
+class SyncCursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        updated_at = timezone.now()
+        cursor = sync.encode_cursor(updated_at, 12, 3)
+        self.assertEqual(sync.decode_cursor(cursor), (updated_at, 12, 3))
+
+    def test_empty_cursor_starts_from_the_beginning(self):
+        self.assertEqual(sync.decode_cursor(None), (None, 0, 0))
+        self.assertEqual(sync.decode_cursor(''), (None, 0, 0))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-base64!', 'e30', sync.encode_cursor(None, 1, 1)[:-4]):
+            with self.assertRaises(sync.CursorError):
+                sync.decode_cursor(cursor)
+
+    def test_cursor_older_than_the_tombstones_expires(self):
+        cursor = sync.encode_cursor(timezone.now(), 1, 1)
+        later = timezone.now() + sync.TOMBSTONE_RETENTION + timedelta(minutes=1)
+        with mock.patch('jobs.sync.timezone.now', return_value=later):
+            with self.assertRaises(sync.CursorExpired):
+                sync.decode_cursor(cursor)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ChangesFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', industry='IT', location='Tbilisi', company_size='11-50')
+        cls.employer = CustomUser.objects.create_user(
+            username='employer', email='employer@example.com', password='pw12345!', user_type='employer'
+        )
+        cls.jobs = [create_job(cls.company, cls.employer, title=f'Job {i}') for i in range(3)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.employer)
+        lag = mock.patch.object(sync, 'SAFETY_LAG', timedelta(0))
+        lag.start()
+        self.addCleanup(lag.stop)
+
+    def test_pages_follow_the_cursor(self):
+        seen, cursor = [], None
+        for _ in range(len(self.jobs) + 1):
+            response = self.client.get('/api/jobs/jobs/changes/', {'limit': 2, 'cursor': cursor or ''})
+            self.assertEqual(response.status_code, 200)
+            seen += [job['id'] for job in response.data['changed']]
+            cursor = response.data['cursor']
+            if not response.data['has_more']:
+                break
+        self.assertEqual(sorted(seen), sorted(job.id for job in self.jobs))
+
+    def test_limit_is_at_least_one(self):
+        for limit in (-5, 0):
+            response = self.client.get('/api/jobs/jobs/changes/', {'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['changed']), 1)
+            self.assertTrue(response.data['has_more'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/jobs/jobs/changes/', {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = AutocompleteIndex({
+            ('title', 'senior python developer'): ('Senior Python Developer', 5),
+            ('title', 'python engineer'): ('Python Engineer', 2),
+            ('skill', 1): ('Python', 10),
+            ('company', 7): ('Pythonic Labs', 1),
+            ('skill', 2): ('Hidden', 0),
+        })
+
+    def labels(self, results):
+        return [result['label'] for result in results]
+
+    def test_every_word_start_matches(self):
+        self.assertEqual(
+            self.labels(self.index.search('pyth')),
+            ['Python', 'Senior Python Developer', 'Python Engineer', 'Pythonic Labs'],
+        )
+        self.assertEqual(self.labels(self.index.search('dev')), ['Senior Python Developer'])
+
+    def test_hot_prefixes_match_the_full_search(self):
+        self.assertEqual(self.index.search('py'), self.index.search('py', kinds={'title', 'skill', 'company'}))
+
+    def test_kinds_and_limit(self):
+        self.assertEqual(self.labels(self.index.search('py', kinds={'company'})), ['Pythonic Labs'])
+        self.assertEqual(self.index.search('py', kinds=set()), [])
+        self.assertEqual(len(self.index.search('py', limit=0)), 1)
+
+    def test_zero_weight_terms_are_left_out(self):
+        self.assertEqual(self.index.search('hid'), [])
+
+    def test_snapshot_round_trip(self):
+        loaded = AutocompleteIndex.loads(self.index.dumps())
+        for query in ('p', 'py', 'python e', 'sen', 'labs'):
+            self.assertEqual(loaded.search(query), self.index.search(query))
+        self.assertEqual(loaded.entries, {key: value for key, value in self.index.entries.items() if value[1] > 0})
+
+
+class SkillTaggingTests(SimpleTestCase):
+    def setUp(self):
+        patterns = [('Python', 1), ('React', 2), ('React Native', 3), ('R', 4), ('Go', 5), ('Golang', 5), ('C++', 6)]
+        self.automaton = skill_tagging.Automaton(patterns, ambiguous={'Go', 'React'})
+        patcher = mock.patch.object(skill_tagging, 'get_automaton', return_value=self.automaton)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_whole_words_only(self):
+        self.assertEqual(skill_tagging.extract('Pythonista, python and C++.'), {1, 6})
+
+    def test_short_names_match_case(self):
+        self.assertEqual(skill_tagging.extract('We use R daily'), {4})
+        self.assertEqual(skill_tagging.extract('r and b'), set())
+
+    def test_ambiguous_names_are_strict(self):
+        self.assertEqual(skill_tagging.extract('Go to the office. We write Go.'), {5})
+        self.assertEqual(skill_tagging.extract('Go to the office.'), set())
+        self.assertEqual(skill_tagging.extract('you will react quickly'), set())
+
+    def test_longest_match_wins(self):
+        self.assertEqual(skill_tagging.extract('Built with React Native'), {3})
+
+    def test_scan_positions(self):
+        self.assertEqual(list(self.automaton.scan('Python')), [(0, 6, 'Python', 1)])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Company.objects.create(name='Acme', industry='IT', location='Tbilisi', company_size='11-50')
+        cls.employer = CustomUser.objects.create_user(
+            username='employer', email='employer@example.com', password='pw12345!', user_type='employer'
+        )
+        EmployerProfile.objects.create(user=cls.employer, company=cls.company, can_post_jobs=True)
+        cls.job = create_job(cls.company, cls.employer)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_matching_etag_returns_304(self):
+        response = self.client.get('/api/jobs/jobs/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = self.client.get('/api/jobs/jobs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_saving_a_job_changes_the_etag(self):
+        etag = self.client.get('/api/jobs/jobs/')['ETag']
+        self.job.title = 'Senior Python Developer'
+        self.job.save()
+        response = self.client.get('/api/jobs/jobs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_company_changes_the_job_etag(self):
+        etag = self.client.get('/api/jobs/jobs/')['ETag']
+        self.company.name = 'Acme Corp'
+        self.company.save()
+        self.assertEqual(self.client.get('/api/jobs/jobs/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_query_string_and_scheme_are_part_of_the_etag(self):
+        etag = self.client.get('/api/jobs/jobs/')['ETag']
+        self.assertNotEqual(self.client.get('/api/jobs/jobs/', {'search': 'python'})['ETag'], etag)
+        self.assertNotEqual(self.client.get('/api/jobs/jobs/', secure=True)['ETag'], etag)
@@ -7,5 +7,6 @@ router.register('jobs', views.JobViewSet, basename='job')
 router.register('applications', views.JobApplicationViewSet, basename='job-application')
 
 urlpatterns = [
+    path('autocomplete/', views.AutocompleteView.as_view(), name='autocomplete'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,7 +1,15 @@
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Count
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db.models import Q, Count, Max
+from Jobily.caching import cached_action
+from Jobily.mixins import BatchRetrieveMixin, ConditionalGetMixin, SparseFieldsetMixin
+from accounts import taxonomy
+from accounts.models import Skill
+from accounts.serializers import SkillSerializer
+from . import autocomplete, exports, skill_tagging, sync
 from .models import Job, JobApplication
 from .serializers import (
     JobSerializer,
@@ -11,16 +19,32 @@ from .serializers import (
 from .tasks import notify_application_received, update_job_views
 
 
-class JobViewSet(viewsets.ModelViewSet):
+class JobViewSet(ConditionalGetMixin, SparseFieldsetMixin, BatchRetrieveMixin, viewsets.ModelViewSet):
     queryset = Job.objects.all()
     serializer_class = JobSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    batch_select_related = ('company',)
+    batch_prefetch_related = ('skills',)
 
     def get_serializer_class(self):
         if self.action == 'list':
             return JobListSerializer
         return JobSerializer
 
+    def get_conditional_fingerprint(self):
+        # Company fields are nested in every job, skills only in the detail view
+        fingerprint = {'company_updated_at': Max('company__updated_at')}
+        if self.action == 'retrieve':
+            fingerprint['skills_updated_at'] = Max('skills__updated_at')
+            fingerprint['skills_count'] = Count('skills', distinct=True)
+            # Counters are saved without updated_at
+            fingerprint['views_count'] = Max('views_count')
+            fingerprint['applications_count'] = Max('applications_count')
+        elif self.request.query_params.get('skills'):
+            # Moving a skill in the hierarchy changes which jobs match
+            fingerprint['skills_updated_at'] = Max('skills__updated_at')
+        return fingerprint
+
     def get_queryset(self):
         queryset = Job.objects.filter(status='published')
 
@@ -55,7 +79,9 @@ class JobViewSet(viewsets.ModelViewSet):
         if company:
             queryset = queryset.filter(company_id=company)
         if skills:
-            queryset = queryset.filter(skills__id__in=skills).distinct()
+            # Ids, names or categories, each with its descendant skills
+            terms = [term for value in skills for term in value.split(',')]
+            queryset = queryset.filter(skills__id__in=taxonomy.expand_terms(terms)).distinct()
 
         # Sorting
         sort_by = self.request.query_params.get('sort_by', '-created_at')
@@ -76,8 +102,9 @@ class JobViewSet(viewsets.ModelViewSet):
 
     def retrieve(self, request, *args, **kwargs):
         response = super().retrieve(request, *args, **kwargs)
-        # Asynchronously increment view count
-        update_job_views.delay(self.get_object().id)
+        # Asynchronously increment view count, revalidations (304) aren't views
+        if response.status_code == status.HTTP_200_OK:
+            update_job_views.delay(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
         return response
 
     def perform_create(self, serializer):
@@ -87,16 +114,37 @@ class JobViewSet(viewsets.ModelViewSet):
         if not self.request.user.employer_profile.can_post_jobs:
             raise permissions.PermissionDenied("You don't have permission to post jobs")
 
-        serializer.save(
-            company=self.request.user.employer_profile.company,
+        job = serializer.save(
+            company_id=self.request.user.employer_profile.company_id,
             posted_by=self.request.user
         )
+        self._tag_skills(job)
 
     def perform_update(self, serializer):
         job = self.get_object()
         if job.posted_by != self.request.user and not self.request.user.employer_profile.is_company_admin:
             raise permissions.PermissionDenied("You don't have permission to edit this job")
-        serializer.save()
+        # Skills the old text already mentioned were kept or removed on purpose
+        previous = skill_tagging.extract(*skill_tagging.job_texts(job))
+        self._tag_skills(serializer.save(), ignore=previous)
+
+    def _tag_skills(self, job, ignore=()):
+        """Attach skills the job text mentions, see jobs.skill_tagging"""
+        if not settings.SKILL_TAGGING_ATTACH:
+            return
+        extracted = skill_tagging.extract(*skill_tagging.job_texts(job)) - set(ignore)
+        missing = skill_tagging.missing_skills(job, extracted)
+        if missing:
+            job.skills.add(*missing)
+
+    @action(detail=False, methods=['post'])
+    def suggest_skills(self, request):
+        """Skills mentioned in a draft job text, for the posting form"""
+        texts = [request.data.get(field, '') for field in ('title', 'description', 'requirements', 'responsibilities')]
+        if not all(isinstance(text, str) for text in texts):
+            return Response({"error": "Job texts must be strings"}, status=status.HTTP_400_BAD_REQUEST)
+        skills = Skill.objects.filter(id__in=skill_tagging.extract(*texts)).order_by('name')
+        return Response(SkillSerializer(skills, many=True).data)
 
     def perform_destroy(self, instance):
         if instance.posted_by != self.request.user and not self.request.user.employer_profile.is_company_admin:
@@ -139,13 +187,18 @@ class JobViewSet(viewsets.ModelViewSet):
         })
 
         if serializer.is_valid():
-            application = serializer.save()
+            resume = serializer.validated_data.get('resume')
+            if not resume:
+                # Reference the profile resume, blobs are shared so nothing is copied
+                resume = request.user.job_seeker_profile.resume.name or None
+            application = serializer.save(resume=resume)
             # Send notifications asynchronously
             notify_application_received.delay(application.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['get'])
+    @cached_action(tags=('jobs',), vary_on=('pk', 'query'))
     def similar_jobs(self, request, pk=None):
         """Get similar jobs based on skills and job type"""
         job = self.get_object()
@@ -163,6 +216,39 @@ class JobViewSet(viewsets.ModelViewSet):
         serializer = JobListSerializer(similar_jobs, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def changes(self, request):
+        """Jobs created, updated, unpublished or deleted since a cursor"""
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', sync.DEFAULT_LIMIT)), sync.MAX_LIMIT))
+        except ValueError:
+            limit = sync.DEFAULT_LIMIT
+
+        try:
+            jobs, tombstones, cursor, has_more = sync.changes_since(request.query_params.get('cursor'), limit)
+        except sync.CursorExpired as e:
+            return Response({"error": str(e)}, status=status.HTTP_410_GONE)
+        except sync.CursorError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        published = [job for job in jobs if job.status == 'published']
+        removed = [
+            {'id': job.id, 'status': job.status, 'removed_at': job.updated_at}
+            # Drafts that never went public aren't disclosed
+            for job in jobs if job.status != 'published' and job.published_at is not None
+        ]
+        removed += [
+            {'id': tombstone.job_id, 'status': 'deleted', 'removed_at': tombstone.deleted_at}
+            for tombstone in tombstones
+        ]
+
+        return Response({
+            'changed': JobSerializer(published, many=True, context=self.get_serializer_context()).data,
+            'removed': removed,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+
     @action(detail=False, methods=['get'])
     def my_jobs(self, request):
         """Get jobs posted by the current user's company"""
@@ -172,11 +258,12 @@ class JobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        jobs = Job.objects.filter(company=request.user.employer_profile.company)
+        jobs = Job.objects.filter(company_id=request.user.employer_profile.company_id)
         serializer = JobSerializer(jobs, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
+    @cached_action(tags=('company-jobs:{company}',), vary_on=('company',))
     def statistics(self, request):
         """Get job posting statistics for the company"""
         if not hasattr(request.user, 'employer_profile'):
@@ -185,16 +272,16 @@ class JobViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        company_jobs = Job.objects.filter(company=request.user.employer_profile.company)
+        company_jobs = Job.objects.filter(company_id=request.user.employer_profile.company_id)
         active_jobs = company_jobs.filter(status='published').count()
         total_applications = JobApplication.objects.filter(job__in=company_jobs).count()
 
         # Applications by status
-        applications_by_status = JobApplication.objects.filter(
+        applications_by_status = list(JobApplication.objects.filter(
             job__in=company_jobs
         ).values('status').annotate(
             count=Count('id')
-        )
+        ))
 
         return Response({
             'active_jobs': active_jobs,
@@ -202,7 +289,32 @@ class JobViewSet(viewsets.ModelViewSet):
             'applications_by_status': applications_by_status,
         })
 
-class JobApplicationViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the company's jobs (every job for staff) as CSV or NDJSON"""
+        file_format = request.query_params.get('export_format', 'csv')
+        if file_format not in exports.CONTENT_TYPES:
+            return Response(
+                {"error": "Unsupported export format"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.user.is_staff:
+            jobs = Job.objects.all()
+        elif hasattr(request.user, 'employer_profile'):
+            jobs = Job.objects.filter(company_id=request.user.employer_profile.company_id)
+        else:
+            return Response(
+                {"error": "Only employers can export jobs"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        rows = exports.iter_rows(jobs.order_by('id'), exports.JOB_EXPORT_FIELDS)
+        rows = exports.with_m2m_names(rows, Job.skills.through, 'job', 'skill', 'skills')
+        columns = list(exports.JOB_EXPORT_FIELDS) + ['skills']
+        return exports.export_response(rows, columns, file_format, 'jobs')
+
+class JobApplicationViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     serializer_class = JobApplicationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -210,5 +322,40 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
         if hasattr(self.request.user, 'job_seeker_profile'):
             return JobApplication.objects.filter(applicant=self.request.user.job_seeker_profile)
         elif hasattr(self.request.user, 'employer_profile'):
-            return JobApplication.objects.filter(job__company=self.request.user.employer_profile.company)
-        return JobApplication.objects.none()
\ No newline at end of file
+            return JobApplication.objects.filter(job__company_id=self.request.user.employer_profile.company_id)
+        return JobApplication.objects.none()
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the visible applications as CSV or NDJSON"""
+        file_format = request.query_params.get('export_format', 'csv')
+        if file_format not in exports.CONTENT_TYPES:
+            return Response(
+                {"error": "Unsupported export format"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = exports.iter_rows(self.get_queryset().order_by('id'), exports.APPLICATION_EXPORT_FIELDS)
+        columns = list(exports.APPLICATION_EXPORT_FIELDS)
+        return exports.export_response(rows, columns, file_format, 'applications')
+
+
+class AutocompleteView(APIView):
+    """Suggest job titles, skills and companies for a search prefix"""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            limit = 10
+
+        kinds = None
+        types = request.query_params.get('types')
+        if types:
+            # Only unknown types match nothing
+            kinds = {kind for kind in types.split(',') if kind in autocomplete.KINDS}
+
+        results = autocomplete.get_index().search(query, limit=limit, kinds=kinds)
+        return Response({'query': query, 'results': results})